@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Paradox.settings')
 
 application = get_asgi_application()
+
+# Load in-memory indexes (leaderboard ranks, registered users) before serving the first request,
+# and start each process's background threads on its first request.
+from apis.warmup import warm_up  # noqa: E402
+
+warm_up()
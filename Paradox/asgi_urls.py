@@ -0,0 +1,12 @@
+"""Paradox URL Configuration For ASGI
+
+Requests served by Paradox.asgi are resolved here (ASGI_URLCONF): the hot game endpoints go
+to the async views in apis.async_views, everything else to the same views as under WSGI.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('', include('apis.async_urls')),
+] + wsgi_urlpatterns
@@ -42,6 +42,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apis.middleware.MetricsMiddleware',
+    'apis.middleware.ProfilerMiddleware',
+    'apis.middleware.AsyncRoutesMiddleware',
+    'apis.middleware.ReadRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,9 +82,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the shared in-memory database, whose table locks fail at once
+        # instead of waiting busy_timeout, so the concurrency tests behave like the server.
+        'TEST': {'NAME': BASE_DIR / 'test-db.sqlite3'},
     }
 }
 
+# SQLite tuning
+# PRAGMAs run on every new SQLite connection: WAL so reads never wait for the writer, fsync at
+# checkpoints only (a crash can lose the last commits, not corrupt the file), wait up to
+# busy_timeout ms for the write lock instead of failing with "database is locked", and
+# keep more of the file memory-mapped and cached (cache_size < 0 is in KiB).
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
+# Reads of READ_REPLICA_PATHS may go to READ_REPLICA_ALIASES (aliases in DATABASES holding
+# copies of 'default'); writes always go to 'default'. See Paradox/settings_replicas.py.
+# A client reads from 'default' for READ_REPLICA_PIN_SECONDS after each of its writes; keep it
+# above the replication lag.
+
+DATABASE_ROUTERS = ['apis.routers.ReadReplicaRouter']
+READ_REPLICA_ALIASES = []
+READ_REPLICA_PATHS = ['/leaderboard/', '/questions/', '/hints/', '/exe-members/', '/userProfile/',
+                      '/user-present-or-not/']
+READ_REPLICA_PIN_SECONDS = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -104,7 +136,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = 'en-us'
 
-TIME_ZONE = 'asia/kolkata'
+TIME_ZONE = 'Asia/Kolkata'
 
 USE_I18N = True
 
@@ -121,6 +153,96 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Proxies in front of the app that append the client address to X-Forwarded-For; the IP
+    # throttle keys on REMOTE_ADDR when 0. Set it to the proxy count of the deployment (e.g. 1
+    # behind one nginx), never more, or clients can pick their own throttle key.
+    'NUM_PROXIES': 0,
+}
+
+# Leaderboard
+# Default and maximum number of rows returned per /leaderboard/ page.
+
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
+
+# Seconds between rebuilds of each worker's in-memory rank index, which pick up other workers' writes
+# (done by a background thread of each serving process; 0 leaves it to the requests that find it stale).
+
+LEADERBOARD_RANK_RESYNC_SECONDS = 60
+
+# Milliseconds a rendered first page of /leaderboard/ is served before it is rebuilt.
+
+LEADERBOARD_SNAPSHOT_MAX_AGE_MS = 500
+
+# Registered users membership index
+# Seconds between membership version checks that pick up other workers' signups and deletions, and the
+# Bloom filter false positive rate (each false positive costs one EXISTS query).
+
+MEMBERSHIP_RESYNC_SECONDS = 5
+MEMBERSHIP_ERROR_RATE = 0.01
+
+# Request profiling
+# Requests with a valid signed X-Paradox-Profile header (apis.profiling.make_token) are always profiled,
+# plus this fraction of all requests. Dumps go to PROFILER_DIR, keeping the newest PROFILER_MAX_DUMPS.
+
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_TOKEN_MAX_AGE = 3600
+PROFILER_SAMPLE_INTERVAL = 0.001
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_DUMPS = 200
+
+# Metrics
+# /metrics is served to staff sessions, and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+# when a token is set (None accepts no token).
+
+METRICS_TOKEN = None
+
+# Questions and hints catalog
+# Seconds between checks of the catalog version by each worker's in-memory copy.
+
+CATALOG_CHECK_SECONDS = 5
+
+# Cache-Control of /questions/ and /hints/. Clients revalidate with If-None-Match and get a 304 while unchanged.
+
+CATALOG_CACHE_CONTROL = 'no-cache'
+
+# ASGI
+# URLconf for requests served by Paradox.asgi, and the number of threads the async views
+# run their database queries on.
+
+ASGI_URLCONF = 'Paradox.asgi_urls'
+ASYNC_DB_THREADS = 8
+
+# Throttling
+# Token buckets per view throttle_scope (apis.throttling): `rate` refills a bucket, `burst` is its
+# size. Players on a campus network share an IP, so the IP bucket is much larger than the user one.
+# THROTTLE_STORE keeps the buckets in this process; to share them between the workers of a host use
+# {'BACKEND': 'apis.throttling.SQLiteBucketStore', 'PATH': BASE_DIR / 'throttle.sqlite3'}.
+
+THROTTLE_BUCKETS = {
+    'check_answer': {
+        'user': {'rate': '30/min', 'burst': 10},
+        'ip': {'rate': '600/min', 'burst': 200},
+    },
 }
+THROTTLE_STORE = {'BACKEND': 'apis.throttling.MemoryBucketStore'}
+
+# Coin ledger
+# Seconds between runs of each worker's compactor, which folds ledger entries into Profile.coins
+# (0 disables it; the compact_coin_ledger command then has to run instead). Entries younger than
+# COIN_LEDGER_SETTLE_SECONDS wait for the next run, so slow transactions commit before their range is folded.
+
+COIN_LEDGER_COMPACT_SECONDS = 5
+COIN_LEDGER_SETTLE_SECONDS = 2
+
+# Answer attempts
+# Submissions are buffered in each worker and written every ATTEMPT_LOG_FLUSH_MS milliseconds, or
+# as soon as ATTEMPT_LOG_BATCH_SIZE are waiting (apis.attempts).
+
+ATTEMPT_LOG_BATCH_SIZE = 500
+ATTEMPT_LOG_FLUSH_MS = 1000
 
+# Export
+# Rows fetched per query and written per chunk by the player export (apis.export).
 
+EXPORT_CHUNK_SIZE = 2000
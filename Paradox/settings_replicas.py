@@ -0,0 +1,23 @@
+"""
+Settings profile with read replicas, for trying the read/write split locally:
+
+    DJANGO_SETTINGS_MODULE=Paradox.settings_replicas python manage.py migrate
+    DJANGO_SETTINGS_MODULE=Paradox.settings_replicas python manage.py sync_replicas
+    DJANGO_SETTINGS_MODULE=Paradox.settings_replicas python manage.py runserver
+
+Each replica is its own SQLite file; sync_replicas copies the primary into them, and they
+stay as of that copy, so replication lag is visible. In deployment, point the aliases at
+real replicas of the primary database instead.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+READ_REPLICA_ALIASES = ['replica1', 'replica2']
+
+for alias in READ_REPLICA_ALIASES:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / ('db-%s.sqlite3' % alias),
+        # Tests run against the primary only.
+        'TEST': {'MIRROR': 'default'},
+    }
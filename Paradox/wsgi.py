@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Paradox.settings')
 
 application = get_wsgi_application()
+
+# Load in-memory indexes (leaderboard ranks, registered users) before serving the first request,
+# and start each process's background threads on its first request.
+from apis.warmup import warm_up  # noqa: E402
+
+warm_up()
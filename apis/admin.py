@@ -1,11 +1,87 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .bundles import bundle_rows, load_bundle, read_bundle, write_bundle
 from .models import Questions, Hints, ParadoxUser, Profile
+from .serializers import CatalogBundleSerializer
 
 # Register your models here.
 
 admin.site.register([
-    Questions,
     Hints,
     ParadoxUser,
     Profile
 ])
+
+
+class BundleUploadForm(forms.Form):
+    bundle = forms.FileField(help_text="JSON list or CSV file with level, location, answer and optionally "
+                                       "hint1, hint2, hint3.")
+
+
+def bundle_errors(errors):
+    """
+    Readable lines of the `levels` errors of CatalogBundleSerializer.
+    """
+    if isinstance(errors, dict):
+        # Errors of the list itself, e.g. an empty bundle.
+        return [str(message) for messages in errors.values() for message in messages]
+    lines = []
+    for row, error in enumerate(errors, 1):
+        if isinstance(error, dict):
+            lines.extend('Row %d%s: %s' % (row, '' if field == 'non_field_errors' else ', ' + field,
+                                           ' '.join(map(str, messages)))
+                         for field, messages in error.items())
+        elif error:
+            lines.append(str(error))
+    return lines
+
+
+@admin.register(Questions)
+class QuestionsAdmin(admin.ModelAdmin):
+    """
+    Questions admin with bundle import (one upsert for the whole bundle) and export.
+    """
+    change_list_template = 'admin/apis/questions/change_list.html'
+    actions = ['export_bundle']
+
+    def get_urls(self):
+        return [
+            path('import-bundle/', self.admin_site.admin_view(self.import_bundle),
+                 name='apis_questions_import_bundle'),
+        ] + super().get_urls()
+
+    def import_bundle(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:apis_questions_changelist')
+        form = BundleUploadForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data['bundle']
+            try:
+                rows = read_bundle(upload.read().decode('utf-8'), upload.name)
+            except (UnicodeDecodeError, ValueError) as e:
+                form.add_error('bundle', "Could not read the bundle: %s" % e)
+            else:
+                serializer = CatalogBundleSerializer(data={'levels': rows})
+                if serializer.is_valid():
+                    counts = load_bundle(serializer.validated_data['levels'])
+                    self.message_user(request, "Questions: %d created, %d updated. Hints: %d created, %d updated."
+                                      % (counts['questions'] + counts['hints']), messages.SUCCESS)
+                    return redirect('admin:apis_questions_changelist')
+                for error in bundle_errors(serializer.errors['levels']):
+                    form.add_error('bundle', error)
+        context = dict(self.admin_site.each_context(request), opts=self.model._meta, form=form,
+                       title="Import questions and hints")
+        return TemplateResponse(request, 'admin/apis/questions/import_bundle.html', context)
+
+    def export_bundle(self, request, queryset):
+        response = HttpResponse(write_bundle(bundle_rows(list(queryset.values_list('level', flat=True))), 'json'),
+                                content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename="paradox-catalog.json"'
+        return response
+
+    export_bundle.short_description = "Export selected levels with their hints as a bundle"
@@ -0,0 +1,9 @@
+from rest_framework.urls import path
+from .async_views import UserPresentAsyncView, LeaderBoardAsyncView, ProfileDetailsAsyncView, CheckAnswerAsyncView
+
+urlpatterns = [
+    path('leaderboard/', LeaderBoardAsyncView),
+    path('userProfile/<str:google_id>/', ProfileDetailsAsyncView),
+    path('user-present-or-not/<str:google_id>/', UserPresentAsyncView),
+    path('check-answer/', CheckAnswerAsyncView)
+]
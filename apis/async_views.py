@@ -0,0 +1,155 @@
+"""
+Async Views For The Hot Game Endpoints
+
+Served through Paradox.asgi (see ASGI_URLCONF) with the same requests and responses as the
+views in apis.views. Answers come from the in-memory caches where they can; everything that
+needs the database runs on a bounded pool of ASYNC_DB_THREADS threads, each keeping its own
+connection, so a burst of requests queues for the pool instead of piling up threads.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import NotFound, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from .membership import membership_index
+from .serializers import LeaderBoardSerializer
+from .snapshots import conditional_response
+from .throttling import bucket_store
+from .views import LeaderBoardView, ProfileDetailsView, CheckAnswerView, UserPresentView
+
+db_executor = ThreadPoolExecutor(getattr(settings, 'ASYNC_DB_THREADS', 8), thread_name_prefix='paradox-db')
+
+
+def _call(function, args):
+    try:
+        return function(*args)
+    except DatabaseError:
+        # The connection may be broken; the next job on this thread reconnects.
+        connections.close_all()
+        raise
+
+
+async def run_db(function, *args):
+    """
+    Run `function(*args)` on the database thread pool, in the context of the current request.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(db_executor, partial(context.run, _call, function, args))
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def async_view(view_class, **handlers):
+    """
+    Async view answering the methods in `handlers` with coroutines and handing every other
+    request (OPTIONS, unsupported methods, session-authenticated users, whose requests DRF
+    checks for CSRF) to the sync `view_class` unchanged.
+    """
+    fallback = sync_to_async(view_class.as_view(), thread_sensitive=True)
+    instance = view_class()
+    if hasattr(instance, 'get') and not hasattr(instance, 'head'):
+        instance.head = instance.get  # As View.setup() does, so Allow lists HEAD.
+    headers = instance.default_response_headers
+
+    async def view(request, *args, **kwargs):
+        handler = handlers.get(request.method.lower())
+        if handler is None or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return await fallback(request, *args, **kwargs)
+        try:
+            response = await handler(request, *args, **kwargs)
+        except Exception:
+            response = json_response({"message": "Internal Server Error"}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Headers of every response of the sync view: DRF's own, plus Vary: Cookie because the
+        # sync view reads the session while authenticating.
+        for name, value in headers.items():
+            if name == 'Vary':
+                patch_vary_headers(response, (value,))
+            else:
+                response[name] = value
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    # Same name as the sync view, so metrics and profiles do not depend on the server.
+    update_wrapper(view, view_class, updated=())
+    view.csrf_exempt = True
+    return view
+
+
+def throttled_response(view_class, request):
+    """
+    The 429 response of `view_class` if its throttles refuse `request` (a DRF Request), else None.
+    """
+    view = view_class()
+    try:
+        view.check_throttles(request)
+    except Throttled as e:
+        response = exception_handler(e, {'view': view, 'request': request})
+        throttled = json_response(response.data, response.status_code)
+        # Retry-After; the content type is the renderer's, which DRF only sets when rendering.
+        for name, value in response.items():
+            if name != 'Content-Type':
+                throttled[name] = value
+        return throttled
+    return None
+
+
+async def user_present(request, google_id):
+    present = membership_index.lookup(google_id)
+    if present is None:
+        present = await run_db(membership_index.__contains__, google_id)
+    if present:
+        return json_response({'userPresent': True})
+    return json_response({'userPresent': False}, status.HTTP_404_NOT_FOUND)
+
+
+def leaderboard_page(request):
+    paginator = LeaderBoardView.pagination_class()
+    page = paginator.paginate_queryset(LeaderBoardView.queryset.all(), request)
+    return {'next': paginator.next_cursor, 'results': LeaderBoardSerializer(page, many=True).data}
+
+
+async def leaderboard(request):
+    request = Request(request)
+    paginator = LeaderBoardView.pagination_class()
+    try:
+        if not request.query_params.get(paginator.cursor_query_param):
+            snapshot = LeaderBoardView.get_snapshot(paginator.get_limit(request))
+            content, etag = snapshot.peek() or await run_db(snapshot.get)
+            return conditional_response(request, content, etag)
+        return json_response(await run_db(leaderboard_page, request))
+    except NotFound as e:
+        return json_response({"message": str(e.detail)}, status.HTTP_404_NOT_FOUND)
+
+
+async def profile_details(request, google_id):
+    return json_response(*await run_db(ProfileDetailsView.details, google_id))
+
+
+async def check_answer(request):
+    request = Request(request, parsers=[parser() for parser in CheckAnswerView.parser_classes])
+    if bucket_store().blocking:
+        response = await run_db(throttled_response, CheckAnswerView, request)
+    else:
+        response = throttled_response(CheckAnswerView, request)
+    if response is not None:
+        return response
+    return json_response(*await run_db(CheckAnswerView.check, request.data))
+
+
+UserPresentAsyncView = async_view(UserPresentView, get=user_present)
+LeaderBoardAsyncView = async_view(LeaderBoardView, get=leaderboard)
+ProfileDetailsAsyncView = async_view(ProfileDetailsView, get=profile_details)
+CheckAnswerAsyncView = async_view(CheckAnswerView, post=check_answer)
@@ -0,0 +1,143 @@
+"""
+Batched Logging Of Answer Submissions
+
+record() only appends to this process's buffer, so checking an answer never waits for an
+insert. A background thread, started by the process's first request (see warm_up), writes
+the buffer with one bulk_create and bumps Profile.attempts with one UPDATE per distinct
+count, every ATTEMPT_LOG_FLUSH_MS or as soon as ATTEMPT_LOG_BATCH_SIZE records are waiting.
+The buffer is flushed once more when the process exits normally.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnswerAttempt, ParadoxUser, Profile
+
+logger = logging.getLogger(__name__)
+
+
+def answer_hash(answer):
+    return hashlib.sha256(answer.strip().encode()).hexdigest()
+
+
+class AttemptLog:
+    """
+    Buffer of answer submissions waiting to be written.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+        self.full = threading.Event()
+        self.flusher = None
+
+    def record(self, google_id, level, answer, correct):
+        attempt = AnswerAttempt(user_id=google_id, level=level, answer_hash=answer_hash(answer), correct=correct,
+                                created_at=timezone.now())
+        with self.lock:
+            self.records.append(attempt)
+            if len(self.records) >= getattr(settings, 'ATTEMPT_LOG_BATCH_SIZE', 500):
+                self.full.set()
+
+    def take(self):
+        with self.lock:
+            records, self.records = self.records, []
+            self.full.clear()
+        return records
+
+    def flush(self):
+        """
+        Write the buffered records; returns how many. Records of a failed write go back to the
+        buffer for the next flush.
+        """
+        records = self.take()
+        if not records:
+            return 0
+        try:
+            with transaction.atomic():
+                # Users deleted since their submission would fail the whole insert.
+                existing = set(ParadoxUser.objects.filter(pk__in={attempt.user_id for attempt in records})
+                               .values_list('pk', flat=True))
+                records = [attempt for attempt in records if attempt.user_id in existing]
+                AnswerAttempt.objects.bulk_create(records)
+                users = Counter(attempt.user_id for attempt in records)
+                by_count = {}
+                for google_id, count in users.items():
+                    by_count.setdefault(count, []).append(google_id)
+                for count, google_ids in by_count.items():
+                    Profile.objects.filter(user_id__in=google_ids).update(attempts=F('attempts') + count)
+        except DatabaseError:
+            with self.lock:
+                self.records[:0] = records
+            raise
+        return len(records)
+
+    def clear(self):
+        self.take()
+
+    def start(self):
+        """
+        Start the background flusher, and flush what is left when the process exits.
+        """
+        if self.flusher is not None:
+            return self.flusher
+        with self.lock:
+            if self.flusher is None:
+                self.flusher = Flusher(self, getattr(settings, 'ATTEMPT_LOG_FLUSH_MS', 1000) / 1000)
+                self.flusher.start()
+                atexit.register(self.flusher.stop)
+        return self.flusher
+
+    def after_fork(self):
+        """
+        Reset a forked child: its parent writes the records buffered so far, and none of the
+        parent's threads (the flusher, a holder of the lock) run in the child.
+        """
+        self.lock = threading.Lock()
+        self.records = []
+        self.full = threading.Event()
+        self.flusher = None
+
+
+class Flusher(threading.Thread):
+    """
+    Flushes an AttemptLog every `interval` seconds or as soon as its buffer is full.
+    """
+
+    def __init__(self, log, interval):
+        super().__init__(name='attempt-log-flusher', daemon=True)
+        self.log = log
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.log.full.wait(self.interval)
+            self.flush()
+
+    def flush(self):
+        try:
+            self.log.flush()
+        except DatabaseError as e:
+            logger.warning("Writing answer attempts failed: %s", e)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.log.full.set()
+        self.join()
+        # Whatever was recorded after the thread's last flush.
+        self.flush()
+
+
+attempt_log = AttemptLog()
+os.register_at_fork(after_in_child=attempt_log.after_fork)
@@ -0,0 +1,91 @@
+"""
+Process-Local Questions And Hints Catalog
+
+The catalog is tiny and changes only when an admin edits it, so each worker keeps it in
+memory keyed by level. Every change bumps CatalogVersion; workers compare versions with
+one primary key read at most every CATALOG_CHECK_SECONDS and reload on a mismatch.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CatalogVersion, Questions, Hints
+from .routers import primary_reads
+from .snapshots import make_etag
+
+CATALOG_VERSION_PK = 1
+
+
+def current_version():
+    return CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """
+    Mark the catalog as changed for every worker.
+    """
+    if not CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(version=F('version') + 1):
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK, defaults={'version': 1})
+    catalog.invalidate()
+
+
+class Catalog:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.questions = {}
+        self.hints = {}
+        self.renders = {}
+        self.checked_at = 0.0
+
+    def invalidate(self):
+        """
+        Make the next access reload instead of waiting for the check interval.
+        """
+        self.version = None
+
+    def _due(self):
+        interval = getattr(settings, 'CATALOG_CHECK_SECONDS', 5)
+        return self.version is None or time.monotonic() - self.checked_at >= interval
+
+    def ensure_fresh(self):
+        if not self._due():
+            return
+        with self.lock, primary_reads():
+            if not self._due():
+                return
+            version = current_version()
+            if version != self.version:
+                self.questions = {question.level: question for question in Questions.objects.all()}
+                self.hints = {hint.level: hint for hint in Hints.objects.all()}
+                self.renders = {}
+                self.version = version
+            self.checked_at = time.monotonic()
+
+    def question(self, level):
+        self.ensure_fresh()
+        return self.questions.get(level)
+
+    def hint(self, level):
+        self.ensure_fresh()
+        return self.hints.get(level)
+
+    def rendered(self, name, render):
+        """
+        (content, etag) of `render(rows)` for the 'questions' or 'hints' of the current version,
+        rows ordered by level. Rendered once per version and worker.
+        """
+        self.ensure_fresh()
+        with self.lock:
+            entry = self.renders.get(name)
+            if entry is None:
+                rows = getattr(self, name)
+                content = render([rows[level] for level in sorted(rows)])
+                entry = self.renders[name] = (content, make_etag(content))
+            return entry
+
+
+catalog = Catalog()
@@ -0,0 +1,121 @@
+"""
+Streaming Export Of Every Player In Leaderboard Order
+
+Rows of Profile joined with ParadoxUser and Referral are read with iterator() in chunks of
+EXPORT_CHUNK_SIZE and written out chunk by chunk as CSV or NDJSON, so memory does not grow
+with the number of players. Used by the export endpoint (through stream()) and the
+export_players command.
+"""
+import csv
+import io
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .leaderboard import LEADERBOARD_ORDERING
+from .ledger import pending_coins
+from .metrics import registry
+from .middleware import QueryTracker
+from .models import Profile
+
+logger = logging.getLogger(__name__)
+
+# (column, Profile lookup or expression) of each exported field, after the rank.
+COLUMNS = [
+    ('google_id', F('user_id')),
+    ('name', F('user__name')),
+    ('email', F('user__email')),
+    ('level', F('level')),
+    ('score', F('score')),
+    ('level_reached_at', F('level_reached_at')),
+    ('attempts', F('attempts')),
+    ('coins', F('coins') + pending_coins()),
+    ('ref_code', F('user__referral__ref_code')),
+    ('ref_success', F('user__referral__ref_success')),
+    ('refferral_availed', F('refferral_availed')),
+]
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Last line of a streamed export that failed part way, as its 200 status is already sent.
+TRAILERS = {
+    'csv': 'ERROR,Export failed\r\n',
+    'ndjson': '{"error": "Export failed"}\n',
+}
+
+
+def rows():
+    """
+    (rank, *COLUMNS values) of every player, best first.
+    """
+    names = ['export_%s' % column for column, _ in COLUMNS]
+    queryset = Profile.objects.annotate(**{name: expression for name, (_, expression) in zip(names, COLUMNS)}) \
+        .order_by(*LEADERBOARD_ORDERING).values_list(*names)
+    for rank, row in enumerate(queryset.iterator(chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)), 1):
+        yield (rank,) + row
+
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['rank'] + [column for column, _ in COLUMNS])
+    for chunk in chunks(records, getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there is no player.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_lines(records):
+    columns = ['rank'] + [column for column, _ in COLUMNS]
+    for chunk in chunks(records, getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)):
+        yield ''.join(json.dumps(dict(zip(columns, record)), cls=DjangoJSONEncoder) + '\n' for record in chunk)
+
+
+def export(export_format):
+    """
+    Text chunks of the export of every player in `export_format` (a key of FORMATS).
+    """
+    writer = csv_lines if export_format == 'csv' else ndjson_lines
+    return writer(rows())
+
+
+def stream(export_format, view):
+    """
+    export() for a streaming response, which is consumed after MetricsMiddleware is done with
+    the request: the export's queries are reported as view `view`:stream, and a failure is
+    logged and ends the body with a TRAILERS line instead of silently truncating it.
+    """
+    tracker = QueryTracker()
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            tracker.track(stack)
+            yield from export(export_format)
+    except Exception:
+        logger.exception("Streaming the player export failed")
+        yield TRAILERS[export_format]
+    finally:
+        registry.observe('%s:stream' % view, tracker.count, tracker.seconds, time.perf_counter() - started)
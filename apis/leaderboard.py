@@ -0,0 +1,411 @@
+"""
+Leaderboard Ordering, Keyset Helpers And In-Memory Rank Index
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+
+from .ledger import with_balance
+from .models import Profile
+from .routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+# Ranking used wherever a leaderboard position is computed: furthest level, then score, then
+# who reached the level first. The trailing primary key makes the order total, so keyset
+# seeks never skip or repeat rows and equal players never swap places between polls.
+LEADERBOARD_ORDERING = ('-level', '-score', 'level_reached_at', 'user')
+
+
+def split_ordering(ordering):
+    """
+    Turn ('-score', 'user') into [('score', True), ('user', False)] (field name, descending).
+    """
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def ordering_values(profile, ordering=LEADERBOARD_ORDERING):
+    """
+    Values of the ordering columns for a Profile instance, in ordering order.
+    """
+    values = []
+    for name, _ in split_ordering(ordering):
+        field = Profile._meta.get_field(name)
+        values.append(getattr(profile, field.attname))
+    return values
+
+
+def seek(values, ordering=LEADERBOARD_ORDERING, reverse=False):
+    """
+    Q object matching the rows strictly after `values` in `ordering`
+    (strictly before when `reverse` is True).
+
+    For ('-score', 'user') this is `score < s OR (score = s AND user > u)`, which the
+    composite index on Profile answers with a single range scan.
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (name, descending), value in zip(split_ordering(ordering), values):
+        smaller = descending != reverse
+        condition |= equal & Q(**{'%s__%s' % (name, 'lt' if smaller else 'gt'): value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def reverse_ordering(ordering=LEADERBOARD_ORDERING):
+    """
+    The same ordering walked backwards.
+    """
+    return tuple(name[1:] if name.startswith('-') else '-' + name for name in ordering)
+
+
+def leaderboard_window(google_id, top=10, radius=5):
+    """
+    Top `top` profiles plus up to `radius` profiles on either side of the profile of
+    `google_id`, or None when the user has no profile.
+
+    Indexed range scans of at most `top`/`radius` rows each, plus indexed counts for the rank
+    and total, in one transaction. On SQLite a read transaction sees a single snapshot, so the
+    rank agrees with the rows even while scores move; under READ COMMITTED (e.g. PostgreSQL's
+    default) each statement sees the latest commits and they may disagree by the rows that moved
+    in between. Returns (top rows, rows around including the profile, rank of the first row
+    around, rank of the profile, total).
+    """
+    with transaction.atomic():
+        queryset = with_balance(Profile.objects.all())
+        profile = queryset.filter(pk=google_id).first()
+        if profile is None:
+            return None
+        values = ordering_values(profile)
+        top_rows = list(queryset.order_by(*LEADERBOARD_ORDERING)[:top])
+        above = list(queryset.filter(seek(values, reverse=True)).order_by(*reverse_ordering())[:radius])
+        below = list(queryset.filter(seek(values)).order_by(*LEADERBOARD_ORDERING)[:radius])
+        rank = queryset.filter(seek(values, reverse=True)).count() + 1
+        total = queryset.count()
+    above.reverse()
+    return top_rows, above + [profile] + below, rank - len(above), rank, total
+
+
+def profile_rank(profile):
+    """
+    1-based rank of a Profile, from the rank index when it knows the user and from an
+    indexed count otherwise (e.g. a profile created by another worker since the last resync).
+    """
+    rank = leaderboard_index.rank(profile.pk)
+    if rank is None:
+        rank = Profile.objects.filter(seek(ordering_values(profile), reverse=True)).count() + 1
+    return rank
+
+
+def ranking_key(values, ordering=LEADERBOARD_ORDERING):
+    """
+    Sort key that orders ascending exactly like `ordering` orders rows.
+    Descending columns are negated, so they must be numeric.
+    """
+    return tuple(-value if descending else value
+                 for (_, descending), value in zip(split_ordering(ordering), values))
+
+
+def _place(entries, keys, google_id, key):
+    """
+    Move `google_id` to `key` in an IndexedSkipList and its key map, or remove it when `key` is None.
+    """
+    old = keys.get(google_id)
+    if old == key:
+        return
+    if old is not None:
+        entries.remove(old)
+        del keys[google_id]
+    if key is not None:
+        entries.insert(key)
+        keys[google_id] = key
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, height):
+        self.key = key
+        self.next = [None] * height
+        self.width = [1] * height
+
+
+class IndexedSkipList:
+    """
+    Sorted collection of unique keys with O(log n) insert, remove, rank and positional access.
+
+    Every forward link carries the number of positions it skips, so the rank of a key is the
+    sum of the widths walked while searching for it.
+    """
+    max_levels = 24
+
+    def __init__(self):
+        self.nil = _Node(None, 0)
+        self.head = _Node(None, self.max_levels)
+        self.head.next = [self.nil] * self.max_levels
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _height(self):
+        height = 1
+        while height < self.max_levels and random.random() < 0.5:
+            height += 1
+        return height
+
+    def _chain(self, key):
+        """
+        Rightmost node before `key` on every level, with the positions walked on each level.
+        """
+        chain = [None] * self.max_levels
+        steps = [0] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level] is not self.nil and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        return chain, steps
+
+    def insert(self, key):
+        chain, steps_at_level = self._chain(key)
+        height = self._height()
+        node = _Node(key, height)
+        steps = 0
+        for level in range(height):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.max_levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain, _ = self._chain(key)
+        node = chain[0].next[0]
+        if node is self.nil or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), self.max_levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """
+        Number of keys strictly smaller than `key`.
+        """
+        _, steps = self._chain(key)
+        return sum(steps)
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node = self.head
+        index += 1
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not self.nil:
+            yield node.key
+            node = node.next[0]
+
+
+class LeaderBoardIndex:
+    """
+    Process-local ranking of every Profile, answering "what is my rank" without a query.
+
+    Loaded from the database on first use and kept current by `update`, `refresh` and `discard`, which the
+    Profile signals and write paths call. Other workers' writes are picked up by rebuilding it every
+    LEADERBOARD_RANK_RESYNC_SECONDS, in the background once the process serves requests (see warm_up).
+
+    A rebuild reads the profiles without holding `lock`, so ranks and writes keep being served from the
+    current index meanwhile; the changes made during the build are replayed onto the new index before
+    it replaces the current one.
+    """
+
+    def __init__(self, ordering=LEADERBOARD_ORDERING):
+        self.ordering = ordering
+        self.attnames = [Profile._meta.get_field(name).attname for name, _ in split_ordering(ordering)]
+        self.lock = threading.RLock()
+        # Held for a whole rebuild, so only one runs at a time.
+        self.build_lock = threading.Lock()
+        self.entries = None
+        self.keys = {}
+        # (google_id, key or None when discarded) of the changes made while a rebuild runs.
+        self.journal = None
+        self.loaded_at = 0.0
+
+    @property
+    def loaded(self):
+        return self.entries is not None
+
+    def load(self):
+        with self.build_lock:
+            self._build()
+
+    @primary_reads()
+    def _build(self):
+        with self.lock:
+            self.journal = []
+        try:
+            entries = IndexedSkipList()
+            keys = {}
+            for row in Profile.objects.values_list('pk', *self.attnames).iterator():
+                key = ranking_key(row[1:], self.ordering)
+                entries.insert(key)
+                keys[row[0]] = key
+        except BaseException:
+            with self.lock:
+                self.journal = None
+            raise
+        with self.lock:
+            for google_id, key in self.journal:
+                _place(entries, keys, google_id, key)
+            self.entries, self.keys, self.journal, self.loaded_at = entries, keys, None, time.monotonic()
+
+    def _stale(self):
+        resync = getattr(settings, 'LEADERBOARD_RANK_RESYNC_SECONDS', 60)
+        return not self.loaded or time.monotonic() - self.loaded_at > resync
+
+    def ensure_loaded(self):
+        """
+        Load the index on first use, and rebuild it when stale and no background resync keeps it
+        fresh. Only the first load makes callers wait; while one thread rebuilds a stale index the
+        others keep using it.
+        """
+        if not self._stale():
+            return
+        if self.build_lock.acquire(blocking=not self.loaded):
+            try:
+                if self._stale():
+                    self._build()
+            finally:
+                self.build_lock.release()
+
+    def update(self, profile):
+        """
+        Insert or move a Profile instance to its current position.
+        """
+        key = ranking_key([getattr(profile, attname) for attname in self.attnames], self.ordering)
+        with self.lock:
+            self._record(profile.pk, key)
+
+    def _record(self, google_id, key):
+        """
+        Apply a change (key None for a removal) to the index and to a rebuild in progress.
+        """
+        if self.journal is not None:
+            self.journal.append((google_id, key))
+        if self.loaded:
+            _place(self.entries, self.keys, google_id, key)
+
+    def refresh(self, google_ids, fields):
+        """
+        Re-read the given users after a queryset `update()` (which sends no post_save)
+        changed `fields`. Costs nothing unless one of the fields is part of the ordering.
+        """
+        names = {name for name, _ in split_ordering(self.ordering)}
+        if not (self.loaded or self.journal is not None) or not names.intersection(fields):
+            return
+        with primary_reads():
+            rows = list(Profile.objects.filter(pk__in=google_ids).values_list('pk', *self.attnames))
+        with self.lock:
+            for row in rows:
+                self._record(row[0], ranking_key(row[1:], self.ordering))
+
+    def discard(self, google_id):
+        with self.lock:
+            self._record(google_id, None)
+
+    def rank(self, google_id):
+        """
+        1-based leaderboard position of a user, or None if the user has no profile.
+        """
+        self.ensure_loaded()
+        with self.lock:
+            key = self.keys.get(google_id)
+            if key is None:
+                return None
+            return self.entries.rank(key) + 1
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.entries)
+
+
+leaderboard_index = LeaderBoardIndex()
+
+
+class Resyncer(threading.Thread):
+    """
+    Rebuilds a LeaderBoardIndex every `interval` seconds in the background.
+    """
+
+    def __init__(self, index, interval):
+        super().__init__(name='leaderboard-resyncer', daemon=True)
+        self.index = index
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.index.load()
+            except DatabaseError as e:
+                logger.warning("Rebuilding the rank index failed: %s", e)
+            finally:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+_resyncer = None
+_resyncer_lock = threading.Lock()
+
+
+def start_resyncer():
+    """
+    Start this process's background rebuilds of the rank index, unless LEADERBOARD_RANK_RESYNC_SECONDS is 0.
+    """
+    global _resyncer
+    if _resyncer is not None:
+        return _resyncer
+    interval = getattr(settings, 'LEADERBOARD_RANK_RESYNC_SECONDS', 60)
+    with _resyncer_lock:
+        if interval and _resyncer is None:
+            _resyncer = Resyncer(leaderboard_index, interval)
+            _resyncer.start()
+    return _resyncer
+
+
+def _forget_resyncer():
+    """
+    A forked child has none of its parent's threads: let it start its own resyncer.
+    """
+    global _resyncer, _resyncer_lock
+    _resyncer, _resyncer_lock = None, threading.Lock()
+    leaderboard_index.lock, leaderboard_index.build_lock = threading.RLock(), threading.Lock()
+    leaderboard_index.journal = None
+
+
+os.register_at_fork(after_in_child=_forget_resyncer)
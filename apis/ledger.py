@@ -0,0 +1,151 @@
+"""
+Append-Only Coin Ledger
+
+Coin changes are appended to CoinTransaction instead of rewriting the hot Profile row.
+Profile.coins is a snapshot holding every entry up to Profile.coins_through, so the exact
+balance is the snapshot plus the user's later entries: one range scan of the (user, id)
+index, done in the same statement that reads the snapshot.
+
+compact() folds settled entries into the snapshots in bulk, one transaction per run. Each
+worker runs it every COIN_LEDGER_COMPACT_SECONDS from its first request on (see warm_up),
+and the compact_coin_ledger command runs it by hand. Entries younger than
+COIN_LEDGER_SETTLE_SECONDS are left for the next run, so an entry whose transaction
+commits after a later one's is not skipped.
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CoinLedgerCheckpoint, CoinTransaction, Profile
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PK = 1
+
+# Profiles updated per statement when compacting, below SQLite's limit on query parameters.
+BATCH_SIZE = 300
+
+
+def pending_coins(user='user_id', through='coins_through'):
+    """
+    Expression summing a user's entries not yet in their snapshot, for querysets of Profile
+    (the defaults) or of related models (e.g. user='pk', through='profile__coins_through').
+    """
+    entries = CoinTransaction.objects.filter(user_id=OuterRef(user), id__gt=OuterRef(through)) \
+        .order_by().values('user_id').annotate(total=Sum('amount')).values('total')
+    return Coalesce(Subquery(entries, output_field=IntegerField()), Value(0))
+
+
+def with_balance(queryset):
+    """
+    Profiles annotated with their exact `balance`.
+    """
+    return queryset.annotate(balance=F('coins') + pending_coins())
+
+
+def balance(google_id):
+    """
+    Exact coin balance of a user, or None if they have no profile.
+    """
+    return with_balance(Profile.objects.filter(user_id=google_id)).values_list('balance', flat=True).first()
+
+
+def append(google_id, amount, reason):
+    return CoinTransaction.objects.create(user_id=google_id, amount=amount, reason=reason)
+
+
+def append_many(entries, reason):
+    """
+    Append (google_id, amount) entries in one statement.
+    """
+    CoinTransaction.objects.bulk_create([CoinTransaction(user_id=google_id, amount=amount, reason=reason)
+                                         for google_id, amount in entries])
+
+
+def compact():
+    """
+    Fold every settled entry after the checkpoint into Profile.coins. Returns the number of
+    entries folded, 0 when there is nothing to do or another worker is compacting the same range.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'COIN_LEDGER_SETTLE_SECONDS', 2))
+    low = CoinLedgerCheckpoint.objects.get_or_create(pk=CHECKPOINT_PK)[0].compacted_through
+    high = CoinTransaction.objects.filter(id__gt=low, created_at__lte=cutoff) \
+        .order_by('-id').values_list('id', flat=True).first()
+    if high is None:
+        return 0
+    with transaction.atomic():
+        # Claims the range; a worker that read the same checkpoint finds it moved and stops.
+        # Writing first also takes SQLite's write lock up front, waiting busy_timeout for it.
+        if not CoinLedgerCheckpoint.objects.filter(pk=CHECKPOINT_PK, compacted_through=low) \
+                .update(compacted_through=high):
+            return 0
+        totals = list(CoinTransaction.objects.filter(id__gt=low, id__lte=high).order_by().values('user_id')
+                      .annotate(total=Sum('amount'), entries=Count('id')).values_list('user_id', 'total', 'entries'))
+        for start in range(0, len(totals), BATCH_SIZE):
+            batch = totals[start:start + BATCH_SIZE]
+            Profile.objects.filter(user_id__in=[google_id for google_id, _, _ in batch]).update(
+                coins=F('coins') + Case(*[When(user_id=google_id, then=Value(total)) for google_id, total, _ in batch],
+                                        default=Value(0), output_field=IntegerField()),
+                coins_through=high)
+        return sum(entries for _, _, entries in totals)
+
+
+class Compactor(threading.Thread):
+    """
+    Runs compact() every `interval` seconds in the background.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='coin-ledger-compactor', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                compact()
+            except DatabaseError as e:
+                logger.warning("Coin ledger compaction failed: %s", e)
+            finally:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+
+def start_compactor():
+    """
+    Start this process's background compactor, unless COIN_LEDGER_COMPACT_SECONDS is 0.
+    """
+    global _compactor
+    if _compactor is not None:
+        return _compactor
+    interval = getattr(settings, 'COIN_LEDGER_COMPACT_SECONDS', 5)
+    with _compactor_lock:
+        if interval and _compactor is None:
+            _compactor = Compactor(interval)
+            _compactor.start()
+    return _compactor
+
+
+def _forget_compactor():
+    """
+    A forked child has none of its parent's threads: let it start its own compactor.
+    """
+    global _compactor, _compactor_lock
+    _compactor, _compactor_lock = None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_compactor)
@@ -0,0 +1,14 @@
+"""
+Fold The Coin Ledger Into Profile Balances
+"""
+from django.core.management.base import BaseCommand
+
+from apis.ledger import compact
+
+
+class Command(BaseCommand):
+    help = "Fold settled coin ledger entries into Profile.coins (the workers' compactors do this every " \
+           "COIN_LEDGER_COMPACT_SECONDS)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Compacted %d ledger entries." % compact()))
@@ -0,0 +1,25 @@
+"""
+Write Questions And Hints As a JSON Or CSV Bundle
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.bundles import bundle_rows, write_bundle
+
+
+class Command(BaseCommand):
+    help = "Write every question and hint as a bundle that import_catalog loads back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=['json', 'csv'], default='json')
+        parser.add_argument('--file', help="Where to write the bundle (standard output by default).")
+
+    def handle(self, *args, **options):
+        content = write_bundle(bundle_rows(), options['output'])
+        if not options['file']:
+            self.stdout.write(content, ending='')
+            return
+        try:
+            with open(options['file'], 'w', newline='', encoding='utf-8') as file:
+                file.write(content)
+        except OSError as e:
+            raise CommandError("Could not write %s: %s" % (options['file'], e))
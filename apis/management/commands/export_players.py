@@ -0,0 +1,26 @@
+"""
+Export Every Player As CSV Or NDJSON
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apis import export
+
+
+class Command(BaseCommand):
+    help = "Stream every player (profile, account and referral stats) in leaderboard order as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=list(export.FORMATS), default='csv')
+        parser.add_argument('--file', help="Where to write the export (standard output by default).")
+
+    def handle(self, *args, **options):
+        chunks = export.export(options['output'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        try:
+            with open(options['file'], 'w', newline='', encoding='utf-8') as file:
+                file.writelines(chunks)
+        except OSError as e:
+            raise CommandError("Could not write %s: %s" % (options['file'], e))
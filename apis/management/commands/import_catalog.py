@@ -0,0 +1,33 @@
+"""
+Load Questions And Hints From a JSON Or CSV Bundle
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.bundles import load_bundle, read_bundle
+from apis.serializers import CatalogBundleSerializer
+
+
+class Command(BaseCommand):
+    help = "Upsert questions and hints from a bundle: a JSON list or a CSV file with level, location, answer " \
+           "and optionally hint1, hint2, hint3. Nothing is written unless every level is valid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON or CSV bundle.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as file:
+                rows = read_bundle(file.read(), options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError("Could not read %s: %s" % (options['path'], e))
+        serializer = CatalogBundleSerializer(data={'levels': rows})
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors, indent=2))
+        started = time.perf_counter()
+        counts = load_bundle(serializer.validated_data['levels'])
+        self.stdout.write(self.style.SUCCESS(
+            "Questions: %d created, %d updated. Hints: %d created, %d updated. Took %.3fs."
+            % (counts['questions'] + counts['hints'] + (time.perf_counter() - started,))))
@@ -0,0 +1,37 @@
+"""
+Pre-Register Paradox Users From a CSV Or JSON File
+"""
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apis import services
+from apis.serializers import BulkSignupSerializer
+
+
+class Command(BaseCommand):
+    help = "Sign up users in bulk from a CSV (google_id,name,email header) or a JSON list of objects."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file with google_id, name and email of each user.")
+
+    def read_rows(self, path):
+        with open(path, newline='', encoding='utf-8') as file:
+            if path.endswith('.json'):
+                return json.load(file)
+            return list(csv.DictReader(file))
+
+    def handle(self, *args, **options):
+        try:
+            rows = self.read_rows(options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError("Could not read %s: %s" % (options['path'], e))
+        serializer = BulkSignupSerializer(data={'users': rows})
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors, indent=2))
+        started = time.perf_counter()
+        users = services.register_users(serializer.validated_data['users'])
+        self.stdout.write(self.style.SUCCESS(
+            "Created %d users in %.2fs." % (len(users), time.perf_counter() - started)))
@@ -0,0 +1,32 @@
+"""
+Copy The Primary SQLite Database Into The SQLite Read Replicas
+"""
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Refresh the SQLite databases of READ_REPLICA_ALIASES with a copy of the primary (local testing only)."
+
+    def handle(self, *args, **options):
+        aliases = getattr(settings, 'READ_REPLICA_ALIASES', [])
+        if not aliases:
+            raise CommandError("READ_REPLICA_ALIASES is empty; use a settings profile with replicas.")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("Only SQLite primaries can be copied; real replicas replicate by themselves.")
+        primary.ensure_connection()
+        for alias in aliases:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                raise CommandError("%s is not an SQLite database." % alias)
+            replica.close()
+            target = sqlite3.connect(str(replica.settings_dict['NAME']))
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS("Copied %s into %s." % (DEFAULT_DB_ALIAS, alias)))
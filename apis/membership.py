@@ -0,0 +1,149 @@
+"""
+In-Memory Membership Index Of Registered google_ids
+
+A Bloom filter of every known google_id answers most "is this user registered?" checks
+without a query: a miss is a no as of the last resync, and a hit is confirmed once with
+`.exists()` and then remembered in an exact set. Signups in this worker are added directly.
+Every signup and deletion bumps MembershipVersion in its transaction, and each worker reloads
+the filter when it finds the version changed, checked every MEMBERSHIP_RESYNC_SECONDS: unlike
+the user count, the version never comes back to a value a worker has already seen. So a miss
+may be up to MEMBERSHIP_RESYNC_SECONDS out of date; write paths must not refuse a user on it.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import MembershipVersion, ParadoxUser
+from .routers import primary_reads
+
+MEMBERSHIP_VERSION_PK = 1
+
+
+def current_version():
+    return MembershipVersion.objects.filter(pk=MEMBERSHIP_VERSION_PK).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """
+    Tell every worker's membership index that users signed up or were deleted.
+    """
+    if not MembershipVersion.objects.filter(pk=MEMBERSHIP_VERSION_PK).update(version=F('version') + 1):
+        MembershipVersion.objects.get_or_create(pk=MEMBERSHIP_VERSION_PK, defaults={'version': 1})
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for `capacity` items at `error_rate` false positives.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class MembershipIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.confirmed = set()
+        self.count = 0
+        self.version = None
+        self.checked_at = 0.0
+
+    @primary_reads()
+    def load(self):
+        # Read before the users, so a signup committed in between makes the next check reload again.
+        version = current_version()
+        count = ParadoxUser.objects.count()
+        # Headroom for signups until the next resync; the filter is rebuilt once it fills up.
+        bloom = BloomFilter(max(1024, count * 2), getattr(settings, 'MEMBERSHIP_ERROR_RATE', 0.01))
+        for google_id in ParadoxUser.objects.values_list('pk', flat=True).iterator():
+            bloom.add(google_id)
+        self.bloom, self.confirmed, self.count, self.version, self.checked_at = \
+            bloom, set(), count, version, time.monotonic()
+
+    def ensure_fresh(self):
+        interval = getattr(settings, 'MEMBERSHIP_RESYNC_SECONDS', 5)
+        if self.bloom is not None and time.monotonic() - self.checked_at < interval:
+            return
+        with self.lock, primary_reads():
+            if self.bloom is None:
+                self.load()
+            elif time.monotonic() - self.checked_at >= interval:
+                if current_version() != self.version or self.count > self.bloom.capacity:
+                    self.load()
+                self.checked_at = time.monotonic()
+
+    def add(self, google_id):
+        """
+        Record a signup made by this worker.
+        """
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(google_id)
+                self.confirmed.add(google_id)
+                self.count += 1
+
+    def discard(self, google_id):
+        with self.lock:
+            self.confirmed.discard(google_id)
+
+    def lookup(self, google_id):
+        """
+        Answer from memory alone: True or False, or None when a query is needed
+        (the index is due for a resync, or a Bloom filter hit is not confirmed yet).
+        """
+        bloom = self.bloom
+        if bloom is None or time.monotonic() - self.checked_at >= getattr(settings, 'MEMBERSHIP_RESYNC_SECONDS', 5):
+            return None
+        if google_id not in bloom:
+            return False
+        return True if google_id in self.confirmed else None
+
+    def confirm(self, google_id):
+        """
+        Whether the user exists, for write paths: only users confirmed earlier are answered from
+        memory. A Bloom filter miss may predate another worker's signup, so it costs a query too.
+        """
+        self.ensure_fresh()
+        if google_id in self.confirmed:
+            return True
+        if not ParadoxUser.objects.filter(pk=google_id).exists():
+            return False
+        with self.lock:
+            self.bloom.add(google_id)
+            self.confirmed.add(google_id)
+        return True
+
+    def __contains__(self, google_id):
+        self.ensure_fresh()
+        if google_id not in self.bloom:
+            return False
+        if google_id in self.confirmed:
+            return True
+        if ParadoxUser.objects.filter(pk=google_id).exists():
+            self.confirmed.add(google_id)
+            return True
+        return False
+
+
+membership_index = MembershipIndex()
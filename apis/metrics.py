@@ -0,0 +1,95 @@
+"""
+Per-View Request, SQL Query And Latency Metrics In Prometheus Text Format
+
+Metrics are kept per process; each worker exposes its own numbers at /metrics.
+"""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram; callers hold the owning ViewMetrics lock.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield '%s_bucket{%s,le="%s"} %d' % (name, labels, bound, cumulative)
+        yield '%s_sum{%s} %s' % (name, labels, round(self.sum, 6))
+        yield '%s_count{%s} %d' % (name, labels, self.count)
+
+
+class ViewMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.queries = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries_per_request = Histogram(QUERY_BUCKETS)
+
+    def observe(self, queries, db_seconds, seconds):
+        with self.lock:
+            self.requests += 1
+            self.queries += queries
+            self.latency.observe(seconds)
+            self.db_time.observe(db_seconds)
+            self.queries_per_request.observe(queries)
+
+
+class MetricsRegistry:
+    """
+    ViewMetrics by view name, safe to update from any number of threads.
+    """
+    families = (
+        ('paradox_requests_total', 'counter', 'Requests handled.', 'requests'),
+        ('paradox_db_queries_total', 'counter', 'SQL queries executed.', 'queries'),
+        ('paradox_request_duration_seconds', 'histogram', 'Total request latency.', 'latency'),
+        ('paradox_db_duration_seconds', 'histogram', 'Time spent in SQL per request.', 'db_time'),
+        ('paradox_db_queries_per_request', 'histogram', 'SQL queries per request.', 'queries_per_request'),
+    )
+
+    def __init__(self):
+        self.views = {}
+
+    def observe(self, view, queries, db_seconds, seconds):
+        metrics = self.views.get(view)
+        if metrics is None:
+            metrics = self.views.setdefault(view, ViewMetrics())
+        metrics.observe(queries, db_seconds, seconds)
+
+    def render(self):
+        lines = []
+        views = sorted(self.views.items())
+        for name, kind, help_text, attribute in self.families:
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for view, metrics in views:
+                labels = 'view="%s"' % view.replace('\\', '\\\\').replace('"', '\\"')
+                with metrics.lock:
+                    value = getattr(metrics, attribute)
+                    if kind == 'counter':
+                        lines.append('%s{%s} %d' % (name, labels, value))
+                    else:
+                        lines.extend(value.lines(name, labels))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,241 @@
+"""
+Middleware For The Paradox APIs
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .metrics import registry
+from .profiling import RequestProfile, token_is_valid
+from .routers import replica_reads
+
+logger = logging.getLogger(__name__)
+
+# Trackers of the request being handled. A context variable rather than per-connection state,
+# so queries made for the request on other threads (sync views under ASGI, the async views'
+# database pool) are still counted: both copy the request's context into the thread.
+active_trackers = ContextVar('active_trackers', default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper, installed on every connection, reporting each query to the
+    trackers of the current request.
+    """
+    trackers = active_trackers.get()
+    if not trackers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for tracker in trackers:
+            tracker.add(sql, elapsed)
+
+
+class QueryTracker:
+    """
+    Counts the queries of a request and the time spent in them, and with `record` also keeps
+    each statement and its duration.
+    """
+
+    def __init__(self, record=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = [] if record else None
+
+    def add(self, sql, elapsed):
+        self.seconds += elapsed
+        self.count += 1
+        if self.queries is not None:
+            self.queries.append({'sql': sql, 'ms': round(elapsed * 1000, 3)})
+
+    def track(self, stack):
+        """
+        Report the queries of the current context to this tracker for the lifetime of `stack`.
+        """
+        token = active_trackers.set(active_trackers.get() + (self,))
+        stack.callback(active_trackers.reset, token)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<unresolved>'
+
+
+class MetricsMiddleware:
+    """
+    Record request count, SQL query count, SQL time and total latency for every view.
+
+    Queries are counted with execute wrappers, so this works with DEBUG off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark this instance as a coroutine function, as Django's MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            tracker.track(stack)
+            response = self.get_response(request)
+        registry.observe(view_name(request), tracker.count, tracker.seconds, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            tracker.track(stack)
+            response = await self.get_response(request)
+        registry.observe(view_name(request), tracker.count, tracker.seconds, time.perf_counter() - started)
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profile single requests that carry a valid signed X-Paradox-Profile header
+    (see apis.profiling.make_token), plus a PROFILER_SAMPLE_RATE fraction of all requests.
+
+    Requests that are not profiled only pay for a header lookup. Under ASGI the profile
+    covers the event loop thread, so it also shows whatever other requests ran meanwhile.
+    """
+    header = 'HTTP_X_PARADOX_PROFILE'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token is None:
+            return bool(self.sample_rate) and random.random() < self.sample_rate
+        return token_is_valid(token)
+
+    def dump(self, profile, request, response, queries):
+        """
+        Write the dumps of a profiled request. The response is already built, so a full disk or
+        an unwritable PROFILER_DIR only loses the profile.
+        """
+        try:
+            profile.dump(view_name(request), request, response, queries)
+        except OSError as e:
+            logger.warning("Writing the profile of %s failed: %s", request.path, e)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        tracker = QueryTracker(record=True)
+        with ExitStack() as stack:
+            tracker.track(stack)
+            with RequestProfile() as profile:
+                response = self.get_response(request)
+        self.dump(profile, request, response, tracker.queries)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+        tracker = QueryTracker(record=True)
+        with ExitStack() as stack:
+            tracker.track(stack)
+            with RequestProfile() as profile:
+                response = await self.get_response(request)
+        self.dump(profile, request, response, tracker.queries)
+        return response
+
+
+class AsyncRoutesMiddleware:
+    """
+    Resolve requests coming through the ASGI application against ASGI_URLCONF, where the
+    hot game endpoints have async views. WSGI requests keep using ROOT_URLCONF.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.urlconf:
+            request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+class ReadRoutingMiddleware:
+    """
+    Let GET and HEAD requests to READ_REPLICA_PATHS read from the read replicas
+    (see apis.routers). Other requests read from the primary.
+
+    Responses to other methods set a signed cookie that pins the client to the primary for
+    READ_REPLICA_PIN_SECONDS, so its next reads see what it just wrote.
+    """
+    sync_capable = True
+    async_capable = True
+    methods = ('GET', 'HEAD')
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+    pin_cookie = 'paradox_primary'
+    pin_salt = 'apis.routers'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(getattr(settings, 'READ_REPLICA_PATHS', ()))
+        self.replicas = list(getattr(settings, 'READ_REPLICA_ALIASES', []))
+        self.pin_seconds = getattr(settings, 'READ_REPLICA_PIN_SECONDS', 5)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def pinned(self, request):
+        return request.get_signed_cookie(self.pin_cookie, default=None, salt=self.pin_salt,
+                                         max_age=self.pin_seconds) is not None
+
+    def routed(self, request):
+        return bool(self.replicas) and request.method in self.methods and request.path.startswith(self.paths) \
+            and not self.pinned(request)
+
+    def pin(self, request, response):
+        if self.replicas and self.pin_seconds and request.method not in self.safe_methods:
+            response.set_signed_cookie(self.pin_cookie, '1', salt=self.pin_salt, max_age=self.pin_seconds,
+                                       httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.routed(request):
+            return self.pin(request, self.get_response(request))
+        with replica_reads(self.replicas):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.routed(request):
+            return self.pin(request, await self.get_response(request))
+        with replica_reads(self.replicas):
+            return await self.get_response(request)
@@ -0,0 +1,52 @@
+# Generated by Django 3.1.6 on 2026-10-18 06:42
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0005_auto_20210203_1714'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExeMembers',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, validators=[django.core.validators.MinLengthValidator(limit_value=3, message='Name Length Should be greater than 3 charcters.')])),
+                ('position', models.CharField(choices=[('Developer', 'Developer'), ('Mentor', 'Mentor'), ('Final year', 'Final year'), ('Coordinator', 'Coordinator'), ('Executive', 'Executive'), ('Volunteer', 'Volunteer')], max_length=255)),
+                ('category', models.CharField(blank=True, choices=[('Full Stack', 'Full Stack'), ('Front End', 'Front End'), ('Back End', 'Back End')], max_length=255, null=True)),
+                ('image', models.URLField(max_length=255)),
+                ('githubUrl', models.URLField(blank=True, max_length=255, null=True, unique=True)),
+                ('linkedInUrl', models.URLField(blank=True, max_length=255, null=True, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rules',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserHintLevel',
+            fields=[
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='apis.paradoxuser', unique=True)),
+                ('level', models.IntegerField(default=1)),
+                ('hintNumber', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='refferral_availed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='questions',
+            name='level',
+            field=models.IntegerField(auto_created=True, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0006_auto_20261018_1212'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-score', 'user'], name='profile_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.1.6 on 2026-10-18 07:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_checkpoint(apps, schema_editor):
+    apps.get_model('apis', 'CoinLedgerCheckpoint').objects.get_or_create(pk=1, defaults={'compacted_through': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0009_one_to_one_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinLedgerCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compacted_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='coins_through',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CoinTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('ad', 'Rewarded advertisement'), ('answer', 'Correct answer'), ('referral', 'Referral'), ('hint', 'Hint purchase')], max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='apis.paradoxuser')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cointransaction',
+            index=models.Index(fields=['user', 'id'], name='cointransaction_user_idx'),
+        ),
+        migrations.RunPython(create_checkpoint, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.6 on 2026-10-18 07:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0010_coin_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerAttempt',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('level', models.IntegerField()),
+                ('answer_hash', models.CharField(max_length=64)),
+                ('correct', models.BooleanField()),
+                ('created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='apis.paradoxuser')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.6 on 2026-10-18 07:13
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def backfill_level_reached_at(apps, schema_editor):
+    # The best guess available for existing players: when their profile was last saved.
+    apps.get_model('apis', 'Profile').objects.update(level_reached_at=F('reg_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0011_answer_attempt'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='profile',
+            name='profile_leaderboard_idx',
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='level_reached_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_level_reached_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-level', '-score', 'level_reached_at', 'user'], name='profile_leaderboard_idx'),
+        ),
+    ]
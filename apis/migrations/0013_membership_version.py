@@ -0,0 +1,20 @@
+# Generated by Django 3.1.6 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0012_level_reached_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from django.core.validators import MinLengthValidator
 
@@ -47,7 +48,7 @@ class Referral(models.Model):
     """
     Model For Referral
     """
-    user = models.ForeignKey(ParadoxUser, on_delete=models.CASCADE, unique=True, primary_key=True)
+    user = models.OneToOneField(ParadoxUser, on_delete=models.CASCADE, primary_key=True)
     ref_code = models.CharField(max_length=255, unique=True)
     ref_success = models.IntegerField(default=0)
 
@@ -59,17 +60,28 @@ class Profile(models.Model):
     """
     Model For User Profile
     """
-    user = models.ForeignKey(ParadoxUser, on_delete=models.CASCADE, unique=True, primary_key=True)
+    user = models.OneToOneField(ParadoxUser, on_delete=models.CASCADE, primary_key=True)
     name = models.CharField(max_length=255, null=False, blank=False)
     image = models.URLField(max_length=255, null=False, blank=False)
     reg_time = models.DateTimeField(auto_now=True)
     level = models.IntegerField(default=1)
+    # When the player reached their level; among equal levels and scores the earliest ranks first.
+    level_reached_at = models.DateTimeField(default=timezone.now)
     attempts = models.IntegerField(default=0)
     score = models.IntegerField(default=0)
+    # Snapshot of the balance including every CoinTransaction up to coins_through (see apis.ledger).
     coins = models.IntegerField(default=100)
+    coins_through = models.BigIntegerField(default=0)
     super_coins = models.IntegerField(default=100)
     refferral_availed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Matches apis.leaderboard.LEADERBOARD_ORDERING so keyset pages are index seeks, and
+            # holds every ordering column so rank counts and the rank index load read only the index.
+            models.Index(fields=['-level', '-score', 'level_reached_at', 'user'], name='profile_leaderboard_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -112,6 +124,68 @@ class UserHintLevel(models.Model):
     """
     Model for User Hints
     """
-    user = models.ForeignKey(ParadoxUser, on_delete=models.CASCADE, unique=True, primary_key=True)
+    user = models.OneToOneField(ParadoxUser, on_delete=models.CASCADE, primary_key=True)
     level = models.IntegerField(default=1)
     hintNumber = models.IntegerField(default=0)
+
+
+class CatalogVersion(models.Model):
+    """
+    Model For The Version Of The Questions And Hints Catalog, Bumped On Every Change
+    """
+    version = models.PositiveIntegerField(default=0)
+
+
+class MembershipVersion(models.Model):
+    """
+    Model For The Version Of The Set Of Registered Users, Bumped On Every Signup And Deletion
+    """
+    version = models.PositiveIntegerField(default=0)
+
+
+class CoinTransaction(models.Model):
+    """
+    Model For Coin Ledger Entries, Folded Into Profile.coins By apis.ledger.compact
+    """
+    AD = 'ad'
+    ANSWER = 'answer'
+    REFERRAL = 'referral'
+    HINT = 'hint'
+    REASONS = [
+        (AD, 'Rewarded advertisement'),
+        (ANSWER, 'Correct answer'),
+        (REFERRAL, 'Referral'),
+        (HINT, 'Hint purchase'),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    # Covered by the (user, id) index.
+    user = models.ForeignKey(ParadoxUser, on_delete=models.CASCADE, db_index=False)
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=16, choices=REASONS)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # A user's entries after their snapshot are one range scan.
+            models.Index(fields=['user', 'id'], name='cointransaction_user_idx'),
+        ]
+
+
+class CoinLedgerCheckpoint(models.Model):
+    """
+    Model For The Last Coin Ledger Entry Folded Into Every Profile.coins
+    """
+    compacted_through = models.BigIntegerField(default=0)
+
+
+class AnswerAttempt(models.Model):
+    """
+    Model For Answer Submissions, Written In Batches By apis.attempts
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(ParadoxUser, on_delete=models.CASCADE)
+    level = models.IntegerField()
+    # SHA-256 of the answer as it is compared (stripped), so guesses can be grouped without storing them.
+    answer_hash = models.CharField(max_length=64)
+    correct = models.BooleanField()
+    created_at = models.DateTimeField()
@@ -0,0 +1,85 @@
+"""
+Pagination Classes
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from .leaderboard import LEADERBOARD_ORDERING, ordering_values, seek, split_ordering
+from .models import Profile
+
+
+class LeaderBoardPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the leaderboard ordering.
+
+    The cursor is an opaque token holding the ordering values of the last row of the
+    previous page, so every page is an index seek plus `limit` rows no matter how deep it is.
+    """
+    ordering = LEADERBOARD_ORDERING
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.default_limit = getattr(settings, 'LEADERBOARD_PAGE_SIZE', 50)
+        self.max_limit = getattr(settings, 'LEADERBOARD_MAX_PAGE_SIZE', 200)
+        self.limit = self.default_limit
+        self.next_cursor = None
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, values):
+        # DjangoJSONEncoder would cut datetimes to milliseconds, and the seek needs them exact.
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+        payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw.decode())
+            fields = split_ordering(self.ordering)
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [Profile._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except (ValueError, TypeError, UnicodeDecodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate(self, queryset, limit, cursor=None):
+        """
+        Rows of the page starting after `cursor` (decoded ordering values); sets `next_cursor`.
+        """
+        self.limit = limit
+        if cursor is not None:
+            queryset = queryset.filter(seek(cursor, self.ordering))
+        page = list(queryset.order_by(*self.ordering)[:limit + 1])
+        if len(page) > limit:
+            page = page[:limit]
+            self.next_cursor = self.encode_cursor(ordering_values(page[-1], self.ordering))
+        else:
+            self.next_cursor = None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate(queryset, self.get_limit(request), self.decode_cursor(request))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_cursor, 'results': data})
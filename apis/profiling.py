@@ -0,0 +1,127 @@
+"""
+Per-Request Profiling Dumps
+
+A profiled request leaves three files sharing one name in PROFILER_DIR:
+
+- `.prof`: cProfile stats (`python -m pstats`, snakeviz, flameprof).
+- `.folded`: sampled stacks in the collapsed format read by flamegraph.pl and speedscope.
+- `.json`: view name, request line, status, duration and every SQL query with its time.
+
+Only the newest PROFILER_MAX_DUMPS dumps are kept.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = 'apis.profiling'
+
+
+def make_token():
+    """
+    Value for the profiling request header, e.g. `python manage.py shell -c "from apis.profiling import
+    make_token; print(make_token())"`. Valid for PROFILER_TOKEN_MAX_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def token_is_valid(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILER_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread every `interval` seconds into folded-stack counts.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    """
+    cProfile plus stack sampling around one request.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILER_SAMPLE_INTERVAL', 0.001))
+        self.started = None
+        self.duration = None
+
+    def __enter__(self):
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+
+    def dump(self, view, request, response, queries):
+        directory = getattr(settings, 'PROFILER_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+        os.makedirs(directory, exist_ok=True)
+        now = time.time()
+        name = '%s.%06d-%d-%s' % (time.strftime('%Y%m%d-%H%M%S', time.localtime(now)), now % 1 * 1e6,
+                                  os.getpid(), re.sub(r'[^A-Za-z0-9_.-]+', '_', view))
+        path = os.path.join(directory, name)
+        self.profiler.dump_stats(path + '.prof')
+        with open(path + '.folded', 'w') as file:
+            file.writelines('%s %d\n' % item for item in self.sampler.stacks.items())
+        with open(path + '.json', 'w') as file:
+            json.dump({
+                'view': view,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': round(self.duration * 1000, 3),
+                'queries': queries,
+            }, file, indent=2)
+        rotate(directory, getattr(settings, 'PROFILER_MAX_DUMPS', 200))
+        return path
+
+
+def rotate(directory, keep):
+    """
+    Delete all but the newest `keep` dumps.
+    """
+    names = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for name in names[:-keep] if keep else names:
+        for extension in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,71 @@
+"""
+Database Router Sending Reads Of Read-Mostly Endpoints To Replicas
+
+Only GET/HEAD requests to READ_REPLICA_PATHS may read from the READ_REPLICA_ALIASES
+(ReadRoutingMiddleware marks them); every write goes to the primary ('default'), and reads
+inside a transaction stay on the primary. A client that just wrote carries a signed cookie for
+READ_REPLICA_PIN_SECONDS and reads from the primary meanwhile, so it sees its own writes
+despite replication lag. Everything outside those requests (other endpoints, commands, cache
+warm-up) uses the primary, and so do the process-wide caches (catalog, rank and membership
+indexes) when a routed request (re)loads them, through primary_reads().
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Replicas the request being handled may read from; a context variable so it follows the
+# request into the threads its queries run on (sync views under ASGI, the async views' database pool).
+routing_state = ContextVar('routing_state', default=None)
+
+
+@contextmanager
+def replica_reads(replicas=None):
+    """
+    Let reads inside the block go to `replicas` (READ_REPLICA_ALIASES by default).
+    """
+    if replicas is None:
+        replicas = list(getattr(settings, 'READ_REPLICA_ALIASES', []))
+    token = routing_state.set(replicas)
+    try:
+        yield
+    finally:
+        routing_state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary inside the block, even during a replica-routed request. For loads of
+    process-wide caches, which must never go back to what a lagging replica still has.
+    """
+    token = routing_state.set(None)
+    try:
+        yield
+    finally:
+        routing_state.reset(token)
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = routing_state.get()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or Django would write instances back to the replica they were read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary (see the sync_replicas command).
+        if db in getattr(settings, 'READ_REPLICA_ALIASES', []):
+            return False
+        return None
@@ -1,5 +1,9 @@
-import uuid
+from collections import Counter
+
 from rest_framework import serializers
+from .catalog import catalog
+from .membership import membership_index
+from .services import generate_ref_code, BATCH_SIZE
 from .models import ParadoxUser, Referral, Questions, Hints, Profile, Rules, ExeMembers, UserHintLevel
 
 
@@ -14,12 +18,75 @@ class UserSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def create(self, validated_data):
-        name = validated_data['name']
-        email = validated_data['email']
-        validated_data['ref_code'] = name[0:3] + str(uuid.uuid1()).split('-')[0][:6]
+        validated_data['ref_code'] = generate_ref_code(validated_data['name'])
         return super().create(validated_data)
 
 
+class SignupSerializer(serializers.Serializer):
+    """
+    Serializer for One User Of a Bulk Signup
+    """
+    google_id = serializers.CharField(max_length=255)
+    name = serializers.CharField(min_length=3, max_length=255)
+    email = serializers.EmailField(max_length=255)
+
+
+class BulkSignupSerializer(serializers.Serializer):
+    """
+    Serializer for Bulk Signup
+
+    Uniqueness is checked for the whole list with one query per batch instead of per user.
+    """
+    users = SignupSerializer(many=True, allow_empty=False)
+
+    def validate_users(self, users):
+        errors = []
+        for field in ('google_id', 'email'):
+            counts = Counter(user[field] for user in users)
+            duplicates = {value for value, count in counts.items() if count > 1}
+            values = list(counts)
+            lookup = 'pk__in' if field == 'google_id' else 'email__in'
+            for start in range(0, len(values), BATCH_SIZE):
+                duplicates.update(ParadoxUser.objects.filter(**{lookup: values[start:start + BATCH_SIZE]})
+                                  .values_list(field, flat=True))
+            errors.extend('%s already exists: %s' % (field, value) for value in sorted(duplicates))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return users
+
+
+class CatalogLevelSerializer(serializers.Serializer):
+    """
+    Serializer for One Level Of a Question And Hint Bundle
+    """
+    level = serializers.IntegerField(min_value=1)
+    location = serializers.CharField(max_length=255)
+    answer = serializers.CharField(max_length=255)
+    hint1 = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    hint2 = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    hint3 = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        given = [bool(attrs.get(field)) for field in ('hint1', 'hint2', 'hint3')]
+        if any(given) and not all(given):
+            raise serializers.ValidationError('Give all three hints of level %s or none.' % attrs['level'])
+        return super().validate(attrs)
+
+
+class CatalogBundleSerializer(serializers.Serializer):
+    """
+    Serializer for a Question And Hint Bundle
+    """
+    levels = CatalogLevelSerializer(many=True, allow_empty=False)
+
+    def validate_levels(self, levels):
+        counts = Counter(level['level'] for level in levels)
+        duplicates = sorted(level for level, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(['level appears more than once: %s' % level for level in duplicates])
+        return levels
+
+
 class QuestionSerializer(serializers.ModelSerializer):
     """
     Serializer for Question Model
@@ -47,17 +114,39 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = "__all__"
+        exclude = ['coins_through']
 
 
 class LeaderBoardSerializer(serializers.ModelSerializer):
     """
     Serializer for LeaderBoard
     """
+    # Exact balance of profiles annotated by ledger.with_balance, not the compacted snapshot.
+    coins = serializers.IntegerField(source='balance', read_only=True)
 
     class Meta:
         model = Profile
-        exclude = ['reg_time', 'attempts', 'super_coins']
+        exclude = ['reg_time', 'attempts', 'super_coins', 'coins_through']
+
+
+class LeaderBoardRankSerializer(serializers.Serializer):
+    """
+    Serializer for a User's LeaderBoard Rank
+    """
+    google_id = serializers.CharField()
+    rank = serializers.IntegerField()
+    total = serializers.IntegerField()
+
+
+class LeaderBoardWindowSerializer(serializers.Serializer):
+    """
+    Serializer for Top Of LeaderBoard Plus The Users Around One User
+    """
+    rank = serializers.IntegerField()
+    total = serializers.IntegerField()
+    around_start = serializers.IntegerField()
+    top = LeaderBoardSerializer(many=True)
+    around = LeaderBoardSerializer(many=True)
 
 
 class RefferalSerializer(serializers.Serializer):
@@ -70,9 +159,11 @@ class RefferalSerializer(serializers.Serializer):
     def validate(self, attrs):
         ref_code = attrs.get('ref_code')
         user = attrs.get('user')
-        if not Referral.objects.filter(ref_code=ref_code).exists():
+        # The view redeems this referral, so it is loaded once here and handed over in validated_data.
+        attrs['referral'] = Referral.objects.filter(ref_code=ref_code).first()
+        if attrs['referral'] is None:
             raise serializers.ValidationError({'ref_code': ('Invalid Referral Code')})
-        if not ParadoxUser.objects.filter(google_id=user).exists():
+        if not membership_index.confirm(user):
             raise serializers.ValidationError({'user': ('Invalid Google Id')})
         return super().validate(attrs)
 
@@ -106,20 +197,26 @@ class UserHintLevelSerializer(serializers.Serializer):
     hintNumber = serializers.IntegerField(min_value=1, max_value=3)
 
     def validate(self, attrs):
-        google_id = attrs.get('google_id')
-        level = attrs.get('level')
-        hintNumber = attrs.get('hintNumber')
-        if not ParadoxUser.objects.filter(google_id=google_id).exists():
+        # Whether the user is on this level and due for this hint is decided by the purchase's
+        # conditional update, so validation needs no query.
+        if not membership_index.confirm(attrs.get('google_id')):
             raise serializers.ValidationError({'user': 'User Not found. Invalid Google Id.'})
-        hintDetails = UserHintLevel.objects.get(user__google_id=google_id)
-        if hintDetails.level == level:
-            if hintDetails.hintNumber >= hintNumber:
-                raise serializers.ValidationError({'user': ('User Has Already Redeemed the Hint.',)})
-        else:
+        attrs['hint'] = catalog.hint(attrs.get('level'))
+        if attrs['hint'] is None:
             raise serializers.ValidationError({'level': ('Invalid Level Number',)})
         return super().validate(attrs)
 
 
+class HintPurchaseSerializer(serializers.Serializer):
+    """
+    Serializer for Unlocked Hint
+    """
+    message = serializers.CharField(max_length=255)
+    hintNumber = serializers.IntegerField()
+    hint = serializers.CharField(max_length=255)
+    coins = serializers.IntegerField()
+
+
 class AnswerSerializer(serializers.Serializer):
     """
     Serializer for checking answer
@@ -130,9 +227,11 @@ class AnswerSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         google_id = attrs.get('google_id')
-        if not ParadoxUser.objects.filter(google_id=google_id).exists():
+        if not membership_index.confirm(google_id):
             raise serializers.ValidationError({'user': 'User Not found. Invalid Google Id.'})
-
+        attrs['question'] = catalog.question(attrs.get('level'))
+        if attrs['question'] is None:
+            raise serializers.ValidationError({'level': ('Invalid Level Number',)})
         return super().validate(attrs)
 
 
@@ -145,7 +244,7 @@ class UpdateCoinSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         google_id = attrs.get('google_id')
-        if not ParadoxUser.objects.filter(google_id=google_id).exists():
+        if not membership_index.confirm(google_id):
             raise serializers.ValidationError({'user': 'User Not found. Invalid Google Id.'})
         return super().validate(attrs)
 
@@ -157,17 +256,72 @@ class MessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=255)
 
 
+class HintStateSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a User's Current Hint State
+    """
+
+    class Meta:
+        model = UserHintLevel
+        fields = ['level', 'hintNumber']
+
+
+class ReferralStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a User's Referral Stats
+    """
+
+    class Meta:
+        model = Referral
+        fields = ['ref_code', 'ref_success']
+
+
 class UserDetailsSerializer(serializers.ModelSerializer):
     """
-    Serializer for User Details (ParadoxUser model + Profile model) serializer
+    Serializer for User Details (ParadoxUser model + Profile, UserHintLevel and Referral models) serializer
+
+    Expects the user to be loaded with select_related('profile', 'userhintlevel', 'referral').
     """
     profile = ProfileSerializer()
+    hints = HintStateSerializer(source='userhintlevel')
+    referral = ReferralStatsSerializer()
 
     class Meta:
         model = ParadoxUser
         fields = "__all__"
 
 
+class CurrentQuestionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a Question Without Its Answer
+    """
+
+    class Meta:
+        model = Questions
+        fields = ['level', 'location']
+
+
+class UnlockedHintsSerializer(serializers.Serializer):
+    """
+    Serializer for the Hints a User Has Unlocked On Their Current Level
+    """
+    level = serializers.IntegerField()
+    hintNumber = serializers.IntegerField()
+    unlocked = serializers.ListField(child=serializers.CharField())
+
+
+class GameStateSerializer(serializers.Serializer):
+    """
+    Serializer for Everything the App Needs On Launch
+    """
+    google_id = serializers.CharField()
+    profile = ProfileSerializer()
+    question = CurrentQuestionSerializer(allow_null=True)
+    hints = UnlockedHintsSerializer()
+    referral = ReferralStatsSerializer()
+    rank = serializers.IntegerField()
+
+
 class ExeMembersPositionListSerializer(serializers.Serializer):
     """
     Serializer for Exe Members Positions List
@@ -0,0 +1,169 @@
+"""
+Account And Profile Mutation Services
+
+Every level and referral change is a single conditional UPDATE built from F()
+expressions. The database applies it atomically, so concurrent requests cannot overwrite
+each other's changes, and the row count it reports tells whether the condition held.
+Coin changes are appended to the coin ledger (apis.ledger) instead of updating Profile.
+"""
+import uuid
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ledger
+from .leaderboard import leaderboard_index
+from .membership import bump_version as bump_membership_version, membership_index
+from .models import ParadoxUser, Profile, Referral, UserHintLevel, CoinTransaction
+
+# Coins rewarded for a correct answer and to both sides of a referral.
+ANSWER_REWARD = 100
+REFERRAL_REWARD = 100
+
+# Price of the first, second and third hint of a level.
+HINT_COSTS = {1: 20, 2: 30, 3: 40}
+
+# Rows per INSERT / IN (...) list, below SQLite's limit on query parameters.
+BATCH_SIZE = 500
+
+
+def generate_ref_code(name):
+    return name[0:3] + str(uuid.uuid1()).split('-')[0][:6]
+
+
+def create_accounts(users):
+    """
+    Profile, Referral and UserHintLevel rows of freshly created users, one INSERT per model.
+    """
+    profiles = Profile.objects.bulk_create([Profile(user=user, name=user.name) for user in users],
+                                           batch_size=BATCH_SIZE)
+    Referral.objects.bulk_create([Referral(user=user, ref_code=user.ref_code) for user in users],
+                                 batch_size=BATCH_SIZE)
+    UserHintLevel.objects.bulk_create([UserHintLevel(user=user, level=1, hintNumber=0) for user in users],
+                                      batch_size=BATCH_SIZE)
+    # bulk_create sends no post_save, so the rank index is told directly once the rows are committed.
+    transaction.on_commit(lambda: [leaderboard_index.update(profile) for profile in profiles])
+
+
+def _unique_ref_codes(names):
+    """
+    Referral codes for `names` that collide neither with each other nor with existing referrals.
+    """
+    codes = [generate_ref_code(name) for name in names]
+    while True:
+        seen = set()
+        for index, code in enumerate(codes):
+            while code in seen:
+                code = names[index][0:3] + uuid.uuid4().hex[:6]
+            codes[index] = code
+            seen.add(code)
+        taken = set()
+        for start in range(0, len(codes), BATCH_SIZE):
+            taken.update(Referral.objects.filter(ref_code__in=codes[start:start + BATCH_SIZE])
+                         .values_list('ref_code', flat=True))
+        if not taken:
+            return codes
+        codes = [names[index][0:3] + uuid.uuid4().hex[:6] if code in taken else code
+                 for index, code in enumerate(codes)]
+
+
+def register_users(rows):
+    """
+    Sign up many users at once from validated dicts of google_id, name and email.
+    Four bulk INSERTs (one per model) per batch, all in one transaction.
+    """
+    codes = _unique_ref_codes([row['name'] for row in rows])
+    users = [ParadoxUser(google_id=row['google_id'], name=row['name'], email=row['email'], ref_code=code)
+             for row, code in zip(rows, codes)]
+    with transaction.atomic():
+        ParadoxUser.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        create_accounts(users)
+        # bulk_create sends no post_save, so the other workers are told here.
+        bump_membership_version()
+        transaction.on_commit(lambda: [membership_index.add(user.pk) for user in users])
+    return users
+
+
+def _update_profile(google_ids, conditions=None, **changes):
+    """
+    Apply `changes` to the profiles of `google_ids` matching `conditions`; returns the row count.
+    """
+    updated = Profile.objects.filter(user_id__in=google_ids, **(conditions or {})).update(**changes)
+    if updated:
+        # After commit, so a rolled back change never reaches the rank index.
+        transaction.on_commit(partial(leaderboard_index.refresh, google_ids, changes))
+    return updated
+
+
+def add_coins(google_id, amount, reason=CoinTransaction.AD):
+    """
+    Credit `amount` coins. Returns False if the user does not exist.
+    Inside an outer transaction, the foreign key check may be deferred to its commit.
+    """
+    try:
+        # Its own savepoint, so a failed insert leaves a caller's transaction usable.
+        with transaction.atomic():
+            ledger.append(google_id, amount, reason)
+    except IntegrityError:
+        return False
+    return True
+
+
+def spend_coins(google_id, amount, reason=CoinTransaction.HINT, conditions=None):
+    """
+    Debit `amount` coins only if the balance covers it (and the profile matches `conditions`).
+    Returns the new balance, or None when it does not.
+    """
+    with transaction.atomic(savepoint=False):
+        # Locks the profile row, serializing debits of a user (credits only raise the balance and
+        # need no lock). A no-op write rather than select_for_update(), which SQLite ignores.
+        if not _update_profile([google_id], conditions or {}, coins_through=F('coins_through')):
+            return None
+        balance = ledger.balance(google_id)
+        if balance < amount:
+            return None
+        ledger.append(google_id, -amount, reason)
+    return balance - amount
+
+
+def redeem_referral(google_id, referrer_id, reward=REFERRAL_REWARD):
+    """
+    Reward a user and the referrer. Returns False if the user has already availed a referral.
+    """
+    with transaction.atomic():
+        if not _update_profile([google_id], {'refferral_availed': False}, refferral_availed=True):
+            return False
+        Referral.objects.filter(user_id=referrer_id).update(ref_success=F('ref_success') + 1)
+        ledger.append_many([(google_id, reward), (referrer_id, reward)], CoinTransaction.REFERRAL)
+    return True
+
+
+def advance_level(google_id, level, reward=ANSWER_REWARD):
+    """
+    Move a user from `level` to the next one and reset their hints.
+    Returns False if the user is not on `level` (e.g. the answer was already rewarded).
+    """
+    with transaction.atomic():
+        if not _update_profile([google_id], {'level': level}, level=F('level') + 1, level_reached_at=timezone.now()):
+            return False
+        UserHintLevel.objects.filter(user_id=google_id).update(level=level + 1, hintNumber=0)
+        ledger.append(google_id, reward, CoinTransaction.ANSWER)
+    return True
+
+
+def buy_hint(google_id, level, hint_number):
+    """
+    Unlock hint `hint_number` of `level` for its HINT_COSTS price and return the new balance.
+    Returns None, changing nothing, when the user is not on `level`, the hint is not the next
+    one or the balance does not cover it.
+    """
+    with transaction.atomic():
+        if not UserHintLevel.objects.filter(user_id=google_id, level=level, hintNumber=hint_number - 1) \
+                .update(hintNumber=hint_number):
+            return None
+        balance = spend_coins(google_id, HINT_COSTS[hint_number], CoinTransaction.HINT, {'level': level})
+        if balance is None:
+            transaction.set_rollback(True)
+        return balance
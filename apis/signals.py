@@ -0,0 +1,77 @@
+"""
+Model Signal Handlers
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import bump_version
+from .leaderboard import leaderboard_index
+from .membership import bump_version as bump_membership_version, membership_index
+from .middleware import dispatch_query
+from .models import ParadoxUser, Profile, Questions, Hints
+
+
+@receiver(post_save, sender=Profile)
+def update_leaderboard_index(sender, instance, **kwargs):
+    """
+    Keep the in-memory rank index in step with saved profiles, once the save commits.
+    """
+    transaction.on_commit(partial(leaderboard_index.update, instance))
+
+
+@receiver(post_delete, sender=Profile)
+def discard_from_leaderboard_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(leaderboard_index.discard, instance.pk))
+
+
+@receiver(post_save, sender=ParadoxUser)
+def add_to_membership_index(sender, instance, created, **kwargs):
+    """
+    Make signups visible to /user-present-or-not/ without a resync, once they commit:
+    Bloom filter bits cannot be removed, so a rolled back signup must never reach it.
+    """
+    if created:
+        bump_membership_version()
+        transaction.on_commit(partial(membership_index.add, instance.pk))
+
+
+@receiver(post_delete, sender=ParadoxUser)
+def discard_from_membership_index(sender, instance, **kwargs):
+    bump_membership_version()
+    membership_index.discard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Questions)
+@receiver([post_save, post_delete], sender=Hints)
+def bump_catalog_version(sender, **kwargs):
+    """
+    Tell every worker's catalog cache that questions or hints changed.
+    """
+    bump_version()
+
+
+@receiver(connection_created)
+def install_query_tracking(sender, connection, **kwargs):
+    """
+    Report every query on this connection to the trackers of the request being handled.
+    """
+    if dispatch_query not in connection.execute_wrappers:
+        # First, so the push/pop of temporary wrappers (execute_wrapper()) never removes it.
+        connection.execute_wrappers.insert(0, dispatch_query)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to every new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        # On the raw connection, so the PRAGMAs are not counted as queries of a request.
+        connection.connection.execute('PRAGMA %s = %s' % (name, value))
@@ -0,0 +1,81 @@
+"""
+Pre-Rendered Response Snapshots
+"""
+import hashlib
+import threading
+import time
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def make_etag(content):
+    """
+    Strong ETag for a rendered body.
+    """
+    return '"%s"' % hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def etag_matches(request, etag):
+    """
+    Whether the request's If-None-Match header already names `etag`.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def conditional_response(request, content, etag, content_type='application/json', cache_control='no-cache'):
+    """
+    Serve already rendered bytes, or an empty 304 when the client holds the same version.
+    """
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+class Snapshot:
+    """
+    Rendered bytes and ETag of a response, rebuilt at most once every `max_age_ms`.
+
+    Rebuilds are single-flight: the first thread to find the snapshot expired rebuilds it
+    while the others keep serving the previous bytes. Only the very first build makes
+    other threads wait.
+    """
+
+    def __init__(self, build, max_age_ms):
+        self.build = build
+        self.max_age = max_age_ms / 1000
+        self.lock = threading.Lock()
+        self.current = None
+
+    def stale(self, current):
+        return current is None or time.monotonic() - current[2] >= self.max_age
+
+    def peek(self):
+        """
+        (content, etag) of the current snapshot if it has not expired, else None.
+        """
+        current = self.current
+        return None if self.stale(current) else (current[0], current[1])
+
+    def get(self):
+        """
+        (content, etag) of the current snapshot, rebuilding it if it has expired.
+        """
+        current = self.current
+        if self.stale(current) and self.lock.acquire(blocking=current is None):
+            try:
+                current = self.current
+                if self.stale(current):
+                    content = self.build()
+                    current = self.current = (content, make_etag(content), time.monotonic())
+            finally:
+                self.lock.release()
+        return current[0], current[1]
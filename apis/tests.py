@@ -1,3 +1,1043 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_started
+from django.db import DatabaseError, connection, transaction
+from django.db.utils import ConnectionDoesNotExist
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from . import export, ledger, services
+from .attempts import AttemptLog, answer_hash, attempt_log
+from .bundles import bundle_rows
+from .catalog import catalog, bump_version, current_version
+from .leaderboard import LEADERBOARD_ORDERING, IndexedSkipList, leaderboard_index, ordering_values, seek
+from .membership import membership_index
+from .metrics import registry
+from .profiling import make_token
+from .middleware import ReadRoutingMiddleware
+from .models import ParadoxUser, Profile, Referral, UserHintLevel, Questions, Hints, CoinLedgerCheckpoint, \
+    AnswerAttempt
+from .serializers import AnswerSerializer, BulkSignupSerializer, RefferalSerializer, UpdateCoinSerializer, \
+    UserHintLevelSerializer
+from .routers import ReadReplicaRouter, replica_reads
+from .throttling import MemoryBucketStore, SQLiteBucketStore, bucket_store
+from .warmup import warm_up
+from .views import LeaderBoardView
+
+
+def create_user(google_id, **profile):
+    """
+    Create a user with the Profile, Referral and UserHintLevel rows signup creates.
+    """
+    user = ParadoxUser.objects.create(google_id=google_id, name='User ' + google_id,
+                                      email=google_id + '@example.com', ref_code='ref' + google_id)
+    Profile.objects.create(user=user, name=user.name, image='https://example.com/a.png', **profile)
+    Referral.objects.create(user=user, ref_code=user.ref_code)
+    UserHintLevel.objects.create(user=user)
+    return user
+
+
+class ParadoxTestCase(TestCase):
+    """
+    Test case that starts every test with process-local caches matching the empty database.
+    """
+
+    def setUp(self):
+        # TestCase never commits, so on_commit callbacks would never run: run them at once, as
+        # if every block committed. Rollbacks are tested with TransactionTestCase (CommitHookTests).
+        patcher = mock.patch.object(transaction, 'on_commit', lambda func, using=None: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        membership_index.load()
+        leaderboard_index.load()
+        catalog.invalidate()
+        bucket_store().clear()
+        attempt_log.clear()
+
+
+class ProfileServiceTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice', coins=50)
+        create_user('bob')
+
+    def test_spend_coins_refuses_to_overdraw(self):
+        self.assertEqual(services.spend_coins('alice', 30), 20)
+        self.assertIsNone(services.spend_coins('alice', 30))
+        self.assertEqual(ledger.balance('alice'), 20)
+
+    def test_update_coins_is_one_insert(self):
+        # The INSERT in its savepoint (SAVEPOINT and RELEASE), which is a plain transaction outside tests.
+        with self.assertNumQueries(3):
+            response = self.client.put('/update-coins/', {'google_id': 'alice', 'coins': 10},
+                                       content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ledger.balance('alice'), 60)
+
+    def test_failed_credit_leaves_the_outer_transaction_usable(self):
+        with transaction.atomic():
+            self.assertFalse(services.add_coins('alice', None))
+            self.assertTrue(services.add_coins('alice', 5))
+        self.assertEqual(ledger.balance('alice'), 55)
+
+    def test_correct_answer_is_rewarded_once(self):
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        data = {'google_id': 'alice', 'level': 1, 'answer': 'apple '}
+        first = self.client.post('/check-answer/', data, content_type='application/json')
+        second = self.client.post('/check-answer/', data, content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(Profile.objects.get(pk='alice').level, 2)
+        self.assertEqual(ledger.balance('alice'), 150)
+        self.assertEqual(UserHintLevel.objects.get(pk='alice').level, 2)
+
+    def test_referral_is_availed_once(self):
+        data = {'user': 'alice', 'ref_code': 'refbob'}
+        # Referral lookup, then SAVEPOINT, profile update, referral update, ledger insert, RELEASE.
+        with self.assertNumQueries(6):
+            first = self.client.post('/refferral/', data, content_type='application/json')
+        second = self.client.post('/refferral/', data, content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(ledger.balance('alice'), 150)
+        self.assertEqual(ledger.balance('bob'), 200)
+        self.assertEqual(Referral.objects.get(pk='bob').ref_success, 1)
+
+    def test_buy_hint_charges_tiers_and_returns_the_hint(self):
+        Hints.objects.create(level=1, hint1='fruit', hint2='red', hint3='round')
+        catalog.ensure_fresh()
+
+        def buy(hint_number):
+            return self.client.post('/buy-hint/', {'google_id': 'alice', 'level': 1, 'hintNumber': hint_number},
+                                    content_type='application/json')
+
+        # SAVEPOINT, hint update, profile lock, balance read, ledger insert, RELEASE.
+        with self.assertNumQueries(6):
+            first = buy(1)
+        self.assertEqual(first.json(), {'message': 'Hint Unlocked.', 'hintNumber': 1, 'hint': 'fruit', 'coins': 30})
+        self.assertEqual(buy(1).json(), {'message': 'User Has Already Redeemed the Hint.'})
+        self.assertEqual(buy(3).json(), {'message': 'Previous Hints Not Redeemed.'})
+        self.assertEqual(buy(2).json()['coins'], 0)
+        self.assertEqual(buy(3).json(), {'message': 'Not sufficient coins.'})
+        self.assertEqual(UserHintLevel.objects.get(pk='alice').hintNumber, 2)
+
+
+class AttemptLogTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice')
+        create_user('bob')
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        catalog.ensure_fresh()
+
+    def answer(self, google_id, answer):
+        return self.client.post('/check-answer/', {'google_id': google_id, 'level': 1, 'answer': answer},
+                                content_type='application/json')
+
+    def test_answer_check_only_buffers(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.answer('alice', 'pear')
+        self.assertFalse([query for query in queries if 'apis_answerattempt' in query['sql']])
+        self.assertEqual(AnswerAttempt.objects.count(), 0)
+
+    def test_flush_writes_batches(self):
+        self.answer('alice', 'pear')
+        self.answer('bob', 'pear')
+        self.answer('alice', ' apple')
+        # SAVEPOINT, user check, insert, one attempts update per distinct count, RELEASE.
+        with self.assertNumQueries(6):
+            self.assertEqual(attempt_log.flush(), 3)
+        self.assertEqual(dict(Profile.objects.values_list('pk', 'attempts')), {'alice': 2, 'bob': 1})
+        self.assertEqual(list(AnswerAttempt.objects.filter(user='alice').order_by('id')
+                              .values_list('level', 'answer_hash', 'correct')),
+                         [(1, answer_hash('pear'), False), (1, answer_hash('apple'), True)])
+        self.assertEqual(attempt_log.flush(), 0)
+
+    @override_settings(ATTEMPT_LOG_BATCH_SIZE=2)
+    def test_full_buffer_wakes_the_flusher(self):
+        self.answer('alice', 'pear')
+        self.assertFalse(attempt_log.full.is_set())
+        self.answer('bob', 'pear')
+        self.assertTrue(attempt_log.full.is_set())
+
+
+class BackgroundWorkTests(ParadoxTestCase):
+
+    def test_threads_start_on_the_first_request_not_at_import(self):
+        with mock.patch('apis.warmup.start_compactor') as start_compactor, \
+                mock.patch('apis.warmup.start_resyncer'), mock.patch.object(attempt_log, 'start') as start_flusher:
+            warm_up()
+            self.addCleanup(request_started.disconnect, dispatch_uid='apis.warmup.start_background_work')
+            self.assertEqual((start_compactor.call_count, start_flusher.call_count), (0, 0))
+            self.client.get('/questions/')
+            self.assertEqual((start_compactor.call_count, start_flusher.call_count), (1, 1))
+
+    def test_forked_child_starts_afresh(self):
+        create_user('alice')
+        log = AttemptLog()
+        log.flusher = object()
+        log.record('alice', 1, 'pear', False)
+        log.after_fork()
+        self.assertEqual((log.records, log.flusher), ([], None))
+
+
+class CatalogTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice')
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+
+    def test_answer_check_reads_no_questions(self):
+        catalog.ensure_fresh()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/check-answer/', {'google_id': 'alice', 'level': 1, 'answer': 'pear'},
+                             content_type='application/json')
+        self.assertFalse([query for query in queries if 'apis_questions' in query['sql']])
+
+    def test_edits_reach_the_cache(self):
+        self.assertEqual(catalog.question(1).answer, 'apple')
+        Questions.objects.filter(level=1).update(answer='pear')
+        self.assertEqual(catalog.question(1).answer, 'apple')
+        bump_version()
+        self.assertEqual(catalog.question(1).answer, 'pear')
+
+
+class ProfileDetailsTests(ParadoxTestCase):
+
+    def test_profile_details_is_one_query(self):
+        create_user('alice', coins=60)
+        services.add_coins('alice', 10)
+        with self.assertNumQueries(1):
+            response = self.client.get('/userProfile/alice/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['google_id'], 'alice')
+        self.assertEqual(data['profile']['coins'], 70)
+        self.assertEqual(data['hints'], {'level': 1, 'hintNumber': 0})
+        self.assertEqual(data['referral'], {'ref_code': 'refalice', 'ref_success': 0})
+
+    def test_unknown_user_is_not_found(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/userProfile/nobody/').status_code, 404)
+
+
+class GameStateTests(ParadoxTestCase):
+
+    def test_game_state_is_one_query(self):
+        create_user('alice', level=2, score=50)
+        create_user('bob', level=2, score=100)
+        UserHintLevel.objects.filter(pk='alice').update(level=2, hintNumber=2)
+        Questions.objects.create(level=2, location='/img2.jpeg', answer='apple')
+        Hints.objects.create(level=2, hint1='fruit', hint2='red', hint3='round')
+        catalog.ensure_fresh()
+        with self.assertNumQueries(1):
+            response = self.client.get('/game-state/alice/')
+        data = response.json()
+        self.assertEqual(data['question'], {'level': 2, 'location': '/img2.jpeg'})
+        self.assertEqual(data['hints'], {'level': 2, 'hintNumber': 2, 'unlocked': ['fruit', 'red']})
+        self.assertEqual(data['referral'], {'ref_code': 'refalice', 'ref_success': 0})
+        self.assertEqual((data['profile']['coins'], data['rank']), (100, 2))
+        self.assertEqual(self.client.get('/game-state/nobody/').status_code, 404)
+
+
+@override_settings(COIN_LEDGER_SETTLE_SECONDS=0)
+class LedgerTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice', coins=50)
+        create_user('bob')
+
+    def test_compaction_keeps_balances_exact(self):
+        services.add_coins('alice', 10)
+        services.redeem_referral('alice', 'bob')
+        self.assertEqual(services.spend_coins('alice', 30), 130)
+        self.assertEqual(ledger.compact(), 4)
+        alice, bob = Profile.objects.order_by('pk')
+        self.assertEqual((alice.coins, bob.coins), (130, 200))
+        self.assertEqual(alice.coins_through, CoinLedgerCheckpoint.objects.get().compacted_through)
+        services.add_coins('alice', 5)
+        self.assertEqual((ledger.balance('alice'), ledger.balance('bob')), (135, 200))
+
+    def test_entries_are_folded_once(self):
+        services.add_coins('alice', 10)
+        self.assertEqual(ledger.compact(), 1)
+        self.assertEqual(ledger.compact(), 0)
+        self.assertEqual(Profile.objects.get(pk='alice').coins, 60)
+
+    def test_unsettled_entries_wait(self):
+        services.add_coins('alice', 10)
+        with self.settings(COIN_LEDGER_SETTLE_SECONDS=60):
+            self.assertEqual(ledger.compact(), 0)
+        self.assertEqual(ledger.balance('alice'), 60)
+
+    def test_leaderboards_show_the_exact_balance(self):
+        LeaderBoardView.snapshots.clear()
+        self.addCleanup(LeaderBoardView.snapshots.clear)
+        services.add_coins('alice', 10)
+
+        def coins(rows):
+            return {row['user']: row['coins'] for row in rows}
+
+        self.assertEqual(coins(self.client.get('/leaderboard/').json()['results'])['alice'], 60)
+        self.assertEqual(coins(self.client.get('/leaderboard/?limit=1').json()['results']), {'alice': 60})
+        around = self.client.get('/leaderboard/around/bob/').json()
+        self.assertEqual((coins(around['top'])['alice'], coins(around['around'])['alice']), (60, 60))
+        self.assertEqual(self.client.get('/userProfile/alice/').json()['profile']['coins'], 60)
+
+
+class LeaderboardPaginationTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        LeaderBoardView.snapshots.clear()
+
+    def walk(self, limit, pages=10):
+        """
+        google_ids of every page from the first one, following `next`.
+        """
+        users, url = [], '/leaderboard/?limit=%d' % limit
+        # Bounded, as a broken cursor could return the same page forever.
+        for _ in range(pages):
+            page = self.client.get(url).json()
+            users += [row['user'] for row in page['results']]
+            if not page['next']:
+                return users
+            url = '/leaderboard/?limit=%d&cursor=%s' % (limit, page['next'])
+        self.fail("Still paging after %d pages: %s" % (pages, users))
+
+    def test_cursor_walks_every_row_once(self):
+        for number in range(5):
+            create_user('user%d' % number, score=number * 10)
+        self.assertEqual(self.walk(2), ['user4', 'user3', 'user2', 'user1', 'user0'])
+
+    def test_ties_split_across_pages(self):
+        reached = timezone.now()
+        for google_id in ('erin', 'bob', 'dave', 'alice', 'carol'):
+            create_user(google_id, score=10, level_reached_at=reached)
+        create_user('zoe', score=20)
+        # Pages of two cut the five tied players after bob and after dave.
+        self.assertEqual(self.walk(2), ['zoe', 'alice', 'bob', 'carol', 'dave', 'erin'])
+        self.assertEqual(self.walk(4), ['zoe', 'alice', 'bob', 'carol', 'dave', 'erin'])
+
+    def test_invalid_cursor_is_not_found(self):
+        create_user('alice')
+        wrong_length = base64.urlsafe_b64encode(json.dumps([1, 2]).encode()).decode()
+        for cursor in ('garbage', wrong_length, 'W1td'):
+            response = self.client.get('/leaderboard/?cursor=' + cursor)
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'message': 'Invalid cursor'})
+
+
+class RankIndexTests(ParadoxTestCase):
+
+    def assertRanksMatchDatabase(self):
+        profiles = list(Profile.objects.all())
+        self.assertEqual(len(leaderboard_index), len(profiles))
+        for profile in profiles:
+            counted = Profile.objects.filter(seek(ordering_values(profile), reverse=True)).count() + 1
+            self.assertEqual(leaderboard_index.rank(profile.pk), counted, profile.pk)
+
+    def test_ranks_follow_updates_deletes_and_ties(self):
+        reached = timezone.now()
+        for google_id in ('alice', 'bob', 'carol', 'dave'):
+            create_user(google_id, score=10, level_reached_at=reached)
+        create_user('erin', score=30)
+        self.assertRanksMatchDatabase()
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        services.advance_level('carol', 1)
+        profile = Profile.objects.get(pk='dave')
+        profile.score = 40
+        profile.save()
+        ParadoxUser.objects.filter(pk='bob').delete()
+        self.assertRanksMatchDatabase()
+        self.assertEqual([leaderboard_index.rank(google_id) for google_id in ('carol', 'dave', 'erin', 'alice')],
+                         [1, 2, 3, 4])
+
+    def test_rebuild_keeps_serving_and_replays_changes_made_meanwhile(self):
+        create_user('alice', score=10)
+        create_user('bob', score=20)
+        leaderboard_index.load()
+        insert, during = IndexedSkipList.insert, []
+
+        def lock_is_free():
+            acquired = leaderboard_index.lock.acquire(timeout=1)
+            if acquired:
+                leaderboard_index.lock.release()
+            during.append(acquired)
+
+        def insert_while_building(entries, key):
+            if not during:
+                # The build has started reading profiles: the index stays usable and writable.
+                thread = threading.Thread(target=lock_is_free)
+                thread.start()
+                thread.join()
+                profile = Profile.objects.get(pk='alice')
+                profile.score = 30
+                profile.save()
+                during.append(leaderboard_index.rank('alice'))
+            insert(entries, key)
+
+        with mock.patch.object(IndexedSkipList, 'insert', insert_while_building):
+            leaderboard_index.load()
+        self.assertEqual(during, [True, 1])
+        self.assertRanksMatchDatabase()
+
+    def test_skip_list_matches_a_sorted_list(self):
+        generator = random.Random(7)
+        entries, expected = IndexedSkipList(), []
+        for step in range(2000):
+            if expected and generator.random() < 0.4:
+                key = expected.pop(generator.randrange(len(expected)))
+                entries.remove(key)
+            else:
+                key = (generator.randrange(50), step)
+                entries.insert(key)
+                expected.append(key)
+            expected.sort()
+        self.assertEqual(list(entries), expected)
+        for index in range(0, len(expected), 37):
+            self.assertEqual(entries[index], expected[index])
+            self.assertEqual(entries.rank(expected[index]), index)
+        with self.assertRaises(KeyError):
+            entries.remove((99, 0))
+
+
+class LeaderboardAroundTests(ParadoxTestCase):
+
+    def assertWindowMatchesOrder(self, google_id, radius):
+        ordered = list(Profile.objects.order_by(*LEADERBOARD_ORDERING).values_list('user', flat=True))
+        data = self.client.get('/leaderboard/around/%s/?top=3&radius=%d' % (google_id, radius)).json()
+        start = data['around_start']
+        self.assertEqual([row['user'] for row in data['around']], ordered[start - 1:start - 1 + len(data['around'])])
+        self.assertEqual(ordered[data['rank'] - 1], google_id)
+        self.assertEqual(data['total'], len(ordered))
+        self.assertEqual([row['user'] for row in data['top']], ordered[:3])
+
+    def test_offsets_agree_with_rows_after_a_score_change(self):
+        for number in range(8):
+            create_user('user-%d' % number, score=number * 10)
+        self.assertWindowMatchesOrder('user-4', 2)
+        # Written behind the rank index's back, as another worker's commit would be.
+        Profile.objects.filter(pk='user-1').update(score=75)
+        Profile.objects.filter(pk='user-6').delete()
+        self.assertWindowMatchesOrder('user-4', 2)
+        self.assertWindowMatchesOrder('user-7', 5)
+        self.assertWindowMatchesOrder('user-0', 1)
+
+    def test_one_profile_lookup_and_unknown_users(self):
+        create_user('alice')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/leaderboard/around/alice/')
+        self.assertEqual(sum('"apis_profile"."user_id" = ' in query['sql'] for query in queries), 1)
+        response = self.client.get('/leaderboard/around/nobody/')
+        self.assertEqual(response.status_code, 404)
+
+
+class LeaderboardSnapshotTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        LeaderBoardView.snapshots.clear()
+        self.addCleanup(LeaderBoardView.snapshots.clear)
+        create_user('alice', score=10)
+        create_user('bob', score=20)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get('/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get('/leaderboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content, response['ETag']), (304, b'', etag))
+        response = self.client.get('/leaderboard/', HTTP_IF_NONE_MATCH='"other", ' + etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_mismatched_etag_gets_the_body(self):
+        etag = self.client.get('/leaderboard/')['ETag']
+        response = self.client.get('/leaderboard/', HTTP_IF_NONE_MATCH='"%s"' % ('0' * 32))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual([row['user'] for row in response.json()['results']], ['bob', 'alice'])
+
+    @override_settings(LEADERBOARD_SNAPSHOT_MAX_AGE_MS=0)
+    def test_etag_changes_after_a_profile_update(self):
+        etag = self.client.get('/leaderboard/')['ETag']
+        self.assertEqual(self.client.get('/leaderboard/')['ETag'], etag)
+        profile = Profile.objects.get(pk='alice')
+        profile.score = 30
+        profile.save()
+        response = self.client.get('/leaderboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([row['user'] for row in response.json()['results']], ['alice', 'bob'])
+
+
+class LeaderboardOrderingTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        LeaderBoardView.snapshots.clear()
+
+    def test_ties_go_to_who_reached_the_level_first(self):
+        now = timezone.now()
+        create_user('carol', level=2, score=10, level_reached_at=now)
+        create_user('alice', level=2, score=10, level_reached_at=now - timedelta(microseconds=1))
+        create_user('dave', level=2, score=20, level_reached_at=now + timedelta(seconds=1))
+        create_user('bob', level=3)
+        expected = ['bob', 'dave', 'alice', 'carol']
+        users, page = [], self.client.get('/leaderboard/?limit=1').json()
+        # Bounded, as a cursor that lost precision would return the same page forever.
+        for _ in expected:
+            users += [row['user'] for row in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get('/leaderboard/?limit=1&cursor=' + page['next']).json()
+        self.assertEqual((users, page['next']), (expected, None))
+        self.assertEqual([leaderboard_index.rank(google_id) for google_id in expected], [1, 2, 3, 4])
+
+    def test_correct_answer_stamps_level_reached_at(self):
+        create_user('alice', level_reached_at=timezone.now() - timedelta(days=1))
+        create_user('bob', level=2)
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        self.client.post('/check-answer/', {'google_id': 'alice', 'level': 1, 'answer': 'apple'},
+                         content_type='application/json')
+        self.assertGreater(Profile.objects.get(pk='alice').level_reached_at,
+                           Profile.objects.get(pk='bob').level_reached_at)
+        self.assertEqual(leaderboard_index.rank('alice'), 2)
+
+
+class ExportTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice', score=10)
+        create_user('bob', level=2)
+        Referral.objects.filter(pk='bob').update(ref_success=3)
+        services.add_coins('alice', 5)
+
+    def export(self, output):
+        self.client.force_login(User.objects.get_or_create(username='admin', is_staff=True)[0])
+        response = self.client.get('/export/players/?output=' + output)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_is_admin_only(self):
+        self.assertEqual(self.client.get('/export/players/').status_code, 403)
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_csv_lists_players_in_leaderboard_order(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual([(row['rank'], row['google_id'], row['coins'], row['ref_success']) for row in rows],
+                         [('1', 'bob', '100', '3'), ('2', 'alice', '105', '0')])
+        self.assertEqual(rows[1]['email'], 'alice@example.com')
+
+    def test_ndjson_has_one_object_per_player(self):
+        records = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual([(record['rank'], record['google_id'], record['ref_code']) for record in records],
+                         [(1, 'bob', 'refbob'), (2, 'alice', 'refalice')])
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_failure_part_way_ends_with_an_error_line(self):
+        first = list(export.rows())[:1]
+
+        def failing_rows():
+            yield from first
+            raise DatabaseError('disk I/O error')
+
+        with mock.patch.object(export, 'rows', failing_rows), self.assertLogs('apis.export', 'ERROR'):
+            lines = self.export('ndjson').splitlines()
+        self.assertEqual([json.loads(line) for line in lines][1:], [{'error': 'Export failed'}])
+        with mock.patch.object(export, 'rows', failing_rows), self.assertLogs('apis.export', 'ERROR'):
+            self.assertTrue(self.export('csv').endswith('\r\nERROR,Export failed\r\n'))
+
+    def test_streamed_queries_are_counted(self):
+        before = registry.views.get('apis.views.ExportView:stream')
+        before = before.queries if before else 0
+        self.export('csv')
+        self.assertGreater(registry.views['apis.views.ExportView:stream'].queries, before)
+
+    def test_command_writes_the_same_export(self):
+        output = io.StringIO()
+        call_command('export_players', '--output', 'ndjson', stdout=output)
+        self.assertEqual(output.getvalue(), self.export('ndjson'))
+
+
+class CatalogBundleTests(ParadoxTestCase):
+    bundle = [
+        {'level': 1, 'location': '/img1.jpeg', 'answer': 'pear'},
+        {'level': 2, 'location': '/img2.jpeg', 'answer': 'plum', 'hint1': 'fruit', 'hint2': 'purple', 'hint3': 'stone'},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_import_upserts_and_bumps_the_version_once(self):
+        version = current_version()
+        call_command('import_catalog', self.write('bundle.json', json.dumps(self.bundle)), stdout=io.StringIO())
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual((catalog.question(1).answer, catalog.question(2).answer), ('pear', 'plum'))
+        self.assertEqual(catalog.hint(2).hint2, 'purple')
+        self.assertIsNone(catalog.hint(1))
+
+    def test_invalid_bundle_changes_nothing(self):
+        path = self.write('bundle.csv', 'level,location,answer,hint1\n1,/a.jpeg,pear,\n1,/b.jpeg,plum,\n3,/c.jpeg,fig,x\n')
+        version = current_version()
+        with self.assertRaises(CommandError):
+            call_command('import_catalog', path)
+        self.assertEqual((current_version(), Questions.objects.get().answer), (version, 'apple'))
+
+    def test_export_loads_back(self):
+        call_command('import_catalog', self.write('bundle.json', json.dumps(self.bundle)), stdout=io.StringIO())
+        output = io.StringIO()
+        call_command('export_catalog', '--output', 'csv', stdout=output)
+        Questions.objects.all().delete()
+        Hints.objects.all().delete()
+        call_command('import_catalog', self.write('export.csv', output.getvalue()), stdout=io.StringIO())
+        self.assertEqual(bundle_rows(), self.bundle)
+
+    def test_admin_import(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+        self.assertContains(self.client.get('/admin/apis/questions/'), '/admin/apis/questions/import-bundle/')
+        upload = SimpleUploadedFile('bundle.json', json.dumps(self.bundle).encode())
+        response = self.client.post('/admin/apis/questions/import-bundle/', {'bundle': upload})
+        self.assertRedirects(response, '/admin/apis/questions/')
+        self.assertEqual(Questions.objects.count(), 2)
+        upload = SimpleUploadedFile('bundle.json', json.dumps(self.bundle * 2).encode())
+        response = self.client.post('/admin/apis/questions/import-bundle/', {'bundle': upload})
+        self.assertContains(response, 'level appears more than once: 1')
+
+
+class UserPresentTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice')
+        # As if alice signed up before this worker started.
+        membership_index.load()
+
+    def test_unknown_user_costs_no_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/user-present-or-not/nobody/')
+        self.assertEqual(response.json(), {'userPresent': False})
+
+    def test_known_user_is_confirmed_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/user-present-or-not/alice/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/user-present-or-not/alice/').status_code, 200)
+
+    def test_signup_is_visible_immediately(self):
+        self.client.post('/user/', {'google_id': 'carol', 'name': 'Carol', 'email': 'carol@example.com'},
+                         content_type='application/json')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/user-present-or-not/carol/').json(), {'userPresent': True})
+
+    def test_other_workers_changes_are_picked_up_when_the_count_is_unchanged(self):
+        create_user('bob')
+        membership_index.load()
+        # Another worker deletes bob and signs carol up: this worker's index only sees the version bump.
+        with mock.patch.object(membership_index, 'add'), mock.patch.object(membership_index, 'discard'):
+            ParadoxUser.objects.filter(pk='bob').delete()
+            create_user('carol')
+        self.assertEqual(membership_index.lookup('carol'), False)
+        with self.settings(MEMBERSHIP_RESYNC_SECONDS=0):
+            self.assertEqual(self.client.get('/user-present-or-not/carol/').json(), {'userPresent': True})
+            self.assertNotIn('bob', membership_index)
+
+
+class WriteValidationTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        Hints.objects.create(level=1, hint1='fruit', hint2='red', hint3='hills')
+        # Signed up through another worker, after this worker's membership index was loaded.
+        with mock.patch.object(membership_index, 'add'):
+            create_user('carol')
+        self.assertEqual(membership_index.lookup('carol'), False)
+
+    def test_users_unknown_to_this_worker_are_checked_in_the_database(self):
+        self.assertTrue(UpdateCoinSerializer(data={'google_id': 'carol', 'coins': 10}).is_valid())
+        self.assertTrue(AnswerSerializer(data={'google_id': 'carol', 'level': 1, 'answer': 'pear'}).is_valid())
+        self.assertTrue(UserHintLevelSerializer(data={'google_id': 'carol', 'level': 1, 'hintNumber': 1}).is_valid())
+        self.assertTrue(RefferalSerializer(data={'user': 'carol', 'ref_code': 'refcarol'}).is_valid())
+        # Confirmed once, then answered from memory.
+        with self.assertNumQueries(0):
+            self.assertTrue(UpdateCoinSerializer(data={'google_id': 'carol', 'coins': 10}).is_valid())
+        serializer = UpdateCoinSerializer(data={'google_id': 'nobody', 'coins': 10})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['user'], ['User Not found. Invalid Google Id.'])
+
+
+class MetricsTests(ParadoxTestCase):
+
+    def test_queries_are_counted_per_view(self):
+        create_user('alice')
+        before = registry.views.get('apis.views.ProfileDetailsView')
+        before = (before.requests, before.queries) if before else (0, 0)
+        self.client.get('/userProfile/alice/')
+        metrics = registry.views['apis.views.ProfileDetailsView']
+        self.assertEqual((metrics.requests, metrics.queries), (before[0] + 1, before[1] + 1))
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('paradox_db_queries_total{view="apis.views.ProfileDetailsView"} %d' % metrics.queries, body)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_need_staff_or_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
+        self.client.force_login(User.objects.create_user('player'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(METRICS_TOKEN=None):
+            self.client.logout()
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+
+class ProfilerTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def profile(self, token, directory=None):
+        with self.settings(PROFILER_DIR=directory or self.directory):
+            return self.client.get('/userProfile/alice/', HTTP_X_PARADOX_PROFILE=token)
+
+    def test_valid_token_writes_the_dumps(self):
+        self.assertEqual(self.profile(make_token()).status_code, 200)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual([os.path.splitext(name)[1] for name in names], ['.folded', '.json', '.prof'])
+        with open(os.path.join(self.directory, names[1])) as file:
+            dump = json.load(file)
+        self.assertEqual((dump['view'], dump['status'], len(dump['queries'])), ('apis.views.ProfileDetailsView', 200, 1))
+
+    def test_invalid_and_expired_tokens_are_ignored(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 7200):
+            expired = make_token()
+        for token in ('profile', make_token() + 'x', expired):
+            self.assertEqual(self.profile(token).status_code, 200)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_unwritable_directory_keeps_the_response(self):
+        # A directory below a regular file can never be created.
+        blocker = os.path.join(self.directory, 'file')
+        open(blocker, 'w').close()
+        with self.assertLogs('apis.middleware', 'WARNING'):
+            response = self.profile(make_token(), os.path.join(blocker, 'profiles'))
+        self.assertEqual(response.status_code, 200)
+
+
+class SignupTests(ParadoxTestCase):
+
+    def test_signup_creates_account_rows(self):
+        response = self.client.post('/user/', {'google_id': 'carol', 'name': 'Carol', 'email': 'carol@example.com'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Referral.objects.get(pk='carol').ref_code, response.json()['ref_code'])
+        self.assertTrue(Profile.objects.filter(pk='carol').exists())
+        self.assertTrue(UserHintLevel.objects.filter(pk='carol', level=1, hintNumber=0).exists())
+
+    def test_bulk_signup_failure_is_logged(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        data = {'users': [{'google_id': 'g1', 'name': 'Player 1', 'email': 'p1@example.com'}]}
+        with mock.patch.object(services, 'register_users', side_effect=DatabaseError('disk I/O error')), \
+                self.assertLogs('apis.views', 'ERROR'):
+            response = self.client.post('/users/bulk/', data, content_type='application/json')
+        self.assertEqual(response.json(), {'message': 'Internal Server Error'})
+
+    def test_bulk_signup_batches_inserts_and_rejects_existing_users(self):
+        create_user('alice')
+        rows = [{'google_id': 'g%d' % i, 'name': 'Player %d' % i, 'email': 'p%d@example.com' % i}
+                for i in range(1200)]
+        with CaptureQueriesContext(connection) as queries:
+            users = services.register_users(rows)
+        # A few batched statements per model rather than one INSERT per row.
+        self.assertLess(len(queries), 50)
+        self.assertEqual(len({user.ref_code for user in users}), 1200)
+        self.assertEqual(Profile.objects.count(), 1201)
+
+        serializer = BulkSignupSerializer(data={'users': rows[:1] + [
+            {'google_id': 'new', 'name': 'Alice again', 'email': 'alice@example.com'}]})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['users'], ['google_id already exists: g0',
+                                                      'email already exists: alice@example.com',
+                                                      'email already exists: p0@example.com'])
+
+
+class CommitHookTests(TransactionTestCase):
+    """
+    In-memory indexes only take changes that commit.
+    """
+
+    def setUp(self):
+        create_user('alice')
+        create_user('bob', score=10)
+        leaderboard_index.load()
+
+    def test_rolled_back_changes_stay_out_of_the_rank_index(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            services.advance_level('alice', 1)
+            Profile.objects.filter(pk='alice').update(score=50)
+            profile = Profile.objects.get(pk='alice')
+            profile.save()
+            raise RuntimeError
+        self.assertEqual(leaderboard_index.rank('alice'), 2)
+        services.advance_level('alice', 1)
+        self.assertEqual(leaderboard_index.rank('alice'), 1)
+
+    def test_rolled_back_signup_is_not_present(self):
+        membership_index.load()
+        with mock.patch.object(services, 'create_accounts', side_effect=RuntimeError):
+            response = self.client.post('/user/', {'google_id': 'carol', 'name': 'Carol',
+                                                   'email': 'carol@example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ParadoxUser.objects.filter(pk='carol').exists())
+        self.assertFalse(membership_index.lookup('carol'))
+        self.assertNotIn('carol', membership_index)
+        self.client.post('/user/', {'google_id': 'carol', 'name': 'Carol', 'email': 'carol@example.com'},
+                         content_type='application/json')
+        self.assertTrue(membership_index.lookup('carol'))
+
+
+@override_settings(READ_REPLICA_ALIASES=['replica'])
+class PrimaryCacheLoadTests(TransactionTestCase):
+    """
+    'replica' is not in DATABASES, so any read routed to it fails.
+    """
+
+    def setUp(self):
+        create_user('alice', score=10)
+        create_user('bob')
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+
+    def test_routed_requests_load_caches_from_the_primary(self):
+        with replica_reads(), self.assertRaises(ConnectionDoesNotExist):
+            Questions.objects.first()
+        catalog.invalidate()
+        response = self.client.get('/questions/')
+        self.assertEqual((response.status_code, response.json()[0]['answer']), (200, 'apple'))
+        leaderboard_index.entries = None
+        response = self.client.get('/leaderboard/rank/bob/')
+        self.assertEqual((response.status_code, response.json()['rank']), (200, 2))
+        with replica_reads():
+            membership_index.load()
+            self.assertEqual(membership_index.lookup('alice'), None)
+            self.assertEqual(membership_index.lookup('nobody'), False)
+
+
+class ConcurrentCoinUpdateTests(TransactionTestCase):
+    threads = 8
+    requests_per_thread = 25
+
+    def setUp(self):
+        create_user('alice', coins=0)
+
+    def run_concurrently(self, target):
+        errors = []
+
+        def worker():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_no_lost_updates(self):
+        def credit():
+            for _ in range(self.requests_per_thread):
+                services.add_coins('alice', 1)
+
+        self.run_concurrently(credit)
+        self.assertEqual(ledger.balance('alice'), self.threads * self.requests_per_thread)
+
+    def test_concurrent_spends_never_overdraw(self):
+        services.add_coins('alice', 50)
+        succeeded = []
+
+        def spend():
+            for _ in range(self.requests_per_thread):
+                if services.spend_coins('alice', 1) is not None:
+                    succeeded.append(1)
+
+        self.run_concurrently(spend)
+        self.assertEqual(len(succeeded), 50)
+        self.assertEqual(ledger.balance('alice'), 0)
+
+
+@override_settings(THROTTLE_BUCKETS={'check_answer': {'user': {'rate': '1/min', 'burst': 2},
+                                                     'ip': {'rate': '1/min', 'burst': 3}}})
+class ThrottleTests(ParadoxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_user('alice')
+        create_user('bob')
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+
+    def guess(self, google_id):
+        return self.client.post('/check-answer/', {'google_id': google_id, 'level': 1, 'answer': 'pear'},
+                                content_type='application/json')
+
+    def test_buckets_per_user_and_ip(self):
+        self.assertEqual([self.guess('alice').status_code for _ in range(2)], [400, 400])
+        with self.assertNumQueries(0):
+            response = self.guess('alice')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # bob's bucket is still full, but the IP bucket (3 tokens) is now empty as well.
+        self.assertEqual(self.guess('bob').status_code, 429)
+
+    def test_forwarded_for_header_does_not_reset_the_ip_bucket(self):
+        statuses = [self.client.post('/check-answer/', {'google_id': google_id, 'level': 1, 'answer': 'pear'},
+                                     content_type='application/json', HTTP_X_FORWARDED_FOR='10.0.0.%d' % number)
+                    .status_code for number, google_id in enumerate(['alice', 'bob', 'alice', 'bob'])]
+        self.assertEqual(statuses, [400, 400, 400, 429])
+
+    def test_memory_store_evicts_least_recently_used_buckets(self):
+        store = MemoryBucketStore(max_keys=3)
+        for key in ('a', 'b', 'c'):
+            store.take(key, 1.0, 2)
+        store.take('a', 1.0, 2)
+        store.take('d', 1.0, 2)
+        self.assertEqual(list(store.buckets), ['c', 'a', 'd'])
+        self.assertEqual(store.take('a', 1.0, 2)[0], False)
+
+    def test_async_view_is_throttled_alike(self):
+        for _ in range(3):
+            expected = self.guess('alice')
+        response = async_to_sync(self.async_client.post)(
+            '/check-answer/', {'google_id': 'alice', 'level': 1, 'answer': 'pear'}, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()), (429, expected.json()))
+
+    def test_sqlite_store_is_shared_between_workers(self):
+        path = os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3')
+        first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+        self.assertEqual(first.take('k', 1.0, 2)[0], True)
+        self.assertEqual(second.take('k', 1.0, 2)[0], True)
+        allowed, wait = first.take('k', 1.0, 2)
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+
+
+class SQLiteTuningTests(TestCase):
+
+    def test_pragmas_are_applied_to_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            # NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(READ_REPLICA_ALIASES=['replica'])
+class ReadRoutingTests(SimpleTestCase):
+
+    def route(self, method, path, cookies=None):
+        router = ReadReplicaRouter()
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        response = ReadRoutingMiddleware(lambda request: HttpResponse(router.db_for_read(Profile)))(request)
+        return response.content.decode(), response.cookies
+
+    def test_reads_of_listed_endpoints_go_to_replicas(self):
+        self.assertEqual(self.route('get', '/leaderboard/')[0], 'replica')
+        self.assertEqual(self.route('get', '/userProfile/alice/')[0], 'replica')
+        self.assertEqual(self.route('get', '/leaderboard/rank/alice/')[0], 'replica')
+        self.assertEqual(self.route('get', '/refferral/')[0], 'default')
+        self.assertEqual(self.route('post', '/exe-members/')[0], 'default')
+        self.assertEqual(ReadReplicaRouter().db_for_write(Profile), 'default')
+
+    def test_client_reads_primary_after_writing(self):
+        alias, cookies = self.route('get', '/leaderboard/')
+        self.assertNotIn('paradox_primary', cookies)
+        alias, cookies = self.route('post', '/check-answer/')
+        pin = {'paradox_primary': cookies['paradox_primary'].value}
+        self.assertEqual(int(cookies['paradox_primary']['max-age']), settings.READ_REPLICA_PIN_SECONDS)
+        self.assertEqual(self.route('get', '/userProfile/alice/', pin)[0], 'default')
+        self.assertEqual(self.route('get', '/userProfile/alice/', {'paradox_primary': '1:forged:sig'})[0], 'replica')
+        with mock.patch('django.core.signing.time.time',
+                        return_value=time.time() + settings.READ_REPLICA_PIN_SECONDS + 1):
+            self.assertEqual(self.route('get', '/userProfile/alice/', pin)[0], 'replica')
+
+
+class AsyncViewTests(TransactionTestCase):
+
+    def setUp(self):
+        create_user('alice', coins=70)
+        create_user('bob', score=300)
+        Questions.objects.create(level=1, location='/img1.jpeg', answer='apple')
+        membership_index.load()
+        leaderboard_index.load()
+        catalog.invalidate()
+        bucket_store().clear()
+        LeaderBoardView.snapshots.clear()
+
+    def test_async_views_answer_like_sync_views(self):
+        paths = ['/user-present-or-not/alice/', '/user-present-or-not/nobody/', '/leaderboard/?limit=1',
+                 '/userProfile/alice/', '/userProfile/nobody/']
+        for path in paths:
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(path.split('?')[0], settings.ASGI_URLCONF).func))
+            expected = self.client.get(path)
+            response = async_to_sync(self.async_client.get)(path)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+            self.assertEqual((response['Allow'], response['Vary']), (expected['Allow'], expected['Vary']))
+
+        cursor = self.client.get('/leaderboard/?limit=1').json()['next']
+        self.assertEqual(async_to_sync(self.async_client.get)('/leaderboard/?cursor=' + cursor).content,
+                         self.client.get('/leaderboard/?cursor=' + cursor).content)
+
+    def test_async_answer_check(self):
+        post = async_to_sync(self.async_client.post)
+        data = {'google_id': 'alice', 'level': 1, 'answer': 'pear'}
+        self.assertEqual(post('/check-answer/', data, content_type='application/json').json(),
+                         {'message': 'Incorrect answer'})
+        data['answer'] = 'apple'
+        response = post('/check-answer/', data, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()), (200, {'message': 'Correct answer'}))
+        self.assertEqual(Profile.objects.get(pk='alice').level, 2)
+        self.assertEqual(post('/check-answer/', {}, content_type='application/json').status_code, 400)
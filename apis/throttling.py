@@ -0,0 +1,206 @@
+"""
+Token-Bucket Throttles
+
+Each view with a `throttle_scope` gets the buckets configured for that scope in
+THROTTLE_BUCKETS, e.g. one bucket per google_id and one per client IP:
+
+    THROTTLE_BUCKETS = {'check_answer': {'user': {'rate': '30/min', 'burst': 10}, ...}}
+
+`rate` (DRF rate syntax) refills a bucket and `burst` is its size. Buckets live in
+THROTTLE_STORE: in this process (MemoryBucketStore), or in an SQLite file every worker on
+the host shares (SQLiteBucketStore). Neither goes through the ORM, so a refused request
+never reaches the database.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ParseError
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Tokens per second of a DRF style rate such as '30/min'.
+    """
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period[0]]
+
+
+def refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def spend(tokens, rate):
+    """
+    (tokens left, allowed, seconds until the next token) after trying to take a token.
+    """
+    if tokens >= 1:
+        return tokens - 1, True, None
+    return tokens, False, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """
+    Buckets of this process. Once more than `max_keys` are kept, the least recently used
+    one is dropped, so memory and the cost of each take stay bounded however many keys
+    clients make up.
+    """
+    blocking = False
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, rate, burst):
+        """
+        Take a token from the bucket of `key`: (allowed, seconds to wait when refused).
+        """
+        now = time.time()
+        with self.lock:
+            bucket = self.buckets.pop(key, None)
+            tokens = burst if bucket is None else refill(bucket[0], bucket[1], now, rate, burst)
+            tokens, allowed, wait = spend(tokens, rate)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class SQLiteBucketStore:
+    """
+    Buckets in an SQLite file (stdlib sqlite3, one connection per thread) shared by every
+    worker process on the host.
+    """
+    blocking = True
+    prune_every = 1000
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+        self.takes = 0
+
+    def connect(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            # Losing the last few bucket updates in a crash only loosens the limits for a moment.
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS token_buckets ('
+                               'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, '
+                               'full_at REAL NOT NULL)')
+            self.local.connection = connection
+        return connection
+
+    def take(self, key, rate, burst):
+        connection = self.connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute('SELECT tokens, updated FROM token_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = burst if row is None else refill(row[0], row[1], now, rate, burst)
+            tokens, allowed, wait = spend(tokens, rate)
+            connection.execute('INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?, ?)',
+                               (key, tokens, now, now + (burst - tokens) / rate))
+            self.takes += 1
+            if self.takes % self.prune_every == 0:
+                # A missing bucket counts as full, so full ones can go.
+                connection.execute('DELETE FROM token_buckets WHERE full_at <= ?', (now,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, wait
+
+    def clear(self):
+        self.connect().execute('DELETE FROM token_buckets')
+
+
+_store = None
+
+
+def bucket_store():
+    """
+    The THROTTLE_STORE of this process.
+    """
+    global _store
+    if _store is None:
+        options = dict(getattr(settings, 'THROTTLE_STORE', {'BACKEND': 'apis.throttling.MemoryBucketStore'}))
+        _store = import_string(options.pop('BACKEND'))(**{name.lower(): value for name, value in options.items()})
+    return _store
+
+
+@receiver(setting_changed)
+def reset_bucket_store(setting, **kwargs):
+    global _store
+    if setting == 'THROTTLE_STORE':
+        _store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per key in THROTTLE_BUCKETS[view.throttle_scope][bucket]; views whose scope
+    has no such bucket are not throttled.
+    """
+    bucket = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        limits = getattr(settings, 'THROTTLE_BUCKETS', {}).get(scope, {}).get(self.bucket)
+        if not limits:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_seconds = bucket_store().take(
+            '%s:%s:%s' % (scope, self.bucket, key), parse_rate(limits['rate']), limits['burst'])
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class GoogleIdBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per google_id in the request body.
+    """
+    bucket = 'user'
+
+    def get_key(self, request, view):
+        try:
+            data = request.data
+        except ParseError:
+            # Left to the view, which rejects the body anyway.
+            return None
+        google_id = data.get('google_id') if hasattr(data, 'get') else None
+        return str(google_id) if google_id is not None else None
+
+
+class IPBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per client IP: REMOTE_ADDR, unless REST_FRAMEWORK['NUM_PROXIES'] says how many
+    proxies in front of the app append to X-Forwarded-For (0 by default, so the header is ignored).
+    """
+    bucket = 'ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
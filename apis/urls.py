@@ -1,12 +1,18 @@
 from rest_framework.urls import path
-from .views import UserView, LeaderBoardView, ProfileDetailsView, QuestionView, \
+from .views import UserView, BulkUserView, LeaderBoardView, LeaderBoardRankView, LeaderBoardAroundView, \
+    ProfileDetailsView, QuestionView, \
     HintsView, ReferralView, ExeMemberView, ExeMemberPositionsView, \
-    UpdateUserCoinsView, UserPresentView, CheckAnswerView
+    UpdateUserCoinsView, UserPresentView, CheckAnswerView, BuyHintView, GameStateView, ExportView
 
 urlpatterns = [
     path('user/', UserView.as_view()),
+    path('users/bulk/', BulkUserView.as_view()),
+    path('export/players/', ExportView.as_view()),
     path('leaderboard/', LeaderBoardView.as_view()),
+    path('leaderboard/rank/<str:google_id>/', LeaderBoardRankView.as_view()),
+    path('leaderboard/around/<str:google_id>/', LeaderBoardAroundView.as_view()),
     path('userProfile/<str:google_id>/', ProfileDetailsView.as_view()),
+    path('game-state/<str:google_id>/', GameStateView.as_view()),
     path('questions/', QuestionView.as_view()),
     path('hints/', HintsView.as_view()),
     path('refferral/', ReferralView.as_view()),
@@ -14,5 +20,6 @@ urlpatterns = [
     path('exe-members-positions/', ExeMemberPositionsView.as_view()),
     path('update-coins/', UpdateUserCoinsView.as_view()),
     path('user-present-or-not/<str:google_id>/', UserPresentView.as_view()),
-    path('check-answer/', CheckAnswerView.as_view())
+    path('check-answer/', CheckAnswerView.as_view()),
+    path('buy-hint/', BuyHintView.as_view())
 ]
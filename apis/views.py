@@ -1,12 +1,64 @@
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import GenericAPIView, ListAPIView, CreateAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from .serializers import UserSerializer, LeaderBoardSerializer, ProfileSerializer, QuestionSerializer, HintSerializer, \
     RefferalSerializer, ExeMembersSerializer, UserHintLevelSerializer, AnswerSerializer, UpdateCoinSerializer, \
-    MessageSerializer, UserDetailsSerializer, ExeMembersPositionListSerializer, IsUserPresentSerializer
+    MessageSerializer, UserDetailsSerializer, ExeMembersPositionListSerializer, IsUserPresentSerializer, \
+    LeaderBoardRankSerializer, LeaderBoardWindowSerializer, BulkSignupSerializer, HintPurchaseSerializer, \
+    GameStateSerializer
+from . import export, services
+from .attempts import attempt_log
+from .ledger import pending_coins, with_balance
+from .catalog import catalog
+from .membership import membership_index
+from .metrics import registry
+from .middleware import view_name
 from .models import Profile, Referral, ParadoxUser, Questions, Hints, ExeMembers, UserHintLevel
+from .leaderboard import LEADERBOARD_ORDERING, leaderboard_index, leaderboard_window, profile_rank
+from .pagination import LeaderBoardPagination
+from .snapshots import Snapshot, conditional_response
+from .throttling import GoogleIdBucketThrottle, IPBucketThrottle
+
+logger = logging.getLogger(__name__)
+
+
+def metrics_allowed(request):
+    """
+    Whether `request` comes from a staff session or carries the METRICS_TOKEN bearer token.
+    """
+    if request.user.is_active and request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and constant_time_compare(credentials, token)
+
+
+def metrics(request):
+    """
+    Per-view request, query and latency metrics of this process, in Prometheus text format.
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def render_list(serializer_class, rows):
+    """
+    JSON bytes of `rows`, exactly as a Response of the serialized list would render them.
+    """
+    return JSONRenderer().render(serializer_class(rows, many=True).data)
 
 
 class UserView(GenericAPIView):
@@ -65,62 +117,175 @@ class UserView(GenericAPIView):
             serializer = UserSerializer(data=request.data)
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            serializer.save()
-            user = ParadoxUser.objects.get(google_id=serializer.validated_data['google_id'])
-            # Create User Profile Related To User
-            profile = Profile.objects.create(
-                user=user,
-                name=user.name,
-            )
-            # Create Referral Related To User
-            referral = Referral.objects.create(
-                user=user,
-                ref_code=user.ref_code
-            )
-            user_hint_level = UserHintLevel.objects.create(
-                user=user,
-                level=1,
-                hintNumber=0
-            )
-            user_hint_level.save()
-            profile.save()
-            referral.save()
+            # The user and its Profile, Referral and UserHintLevel rows are created together or not at all.
+            with transaction.atomic():
+                user = serializer.save()
+                services.create_accounts([user])
             return Response(UserSerializer(user, many=False).data, status=status.HTTP_201_CREATED)
         except Exception as e:
             print(e)
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BulkUserView(GenericAPIView):
+    """
+    Bulk User Signup View
+    """
+    serializer_class = BulkSignupSerializer
+    permission_classes = [IsAdminUser]
+
+    response_schema_dict = {
+        "201": openapi.Response(
+            description="Users Are Created.",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Created 2 users."
+                }
+            }
+        ),
+        "400": openapi.Response(
+            description="Invalid rows or users that already exist. Nothing is created.",
+            schema=BulkSignupSerializer,
+            examples={
+                "application/json": {
+                    "users": [
+                        "email already exists: abcd@gmail.com"
+                    ]
+                }
+            }
+        ),
+        "500": openapi.Response(
+            description="Internal Server Error",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Internal Server Error"
+                }
+            }
+        )
+    }
+
+    @swagger_auto_schema(request_body=BulkSignupSerializer, responses=response_schema_dict)
+    def post(self, request):
+        """
+        ## POST Method To Pre-Register Many Users At Once (Admin Only).
+        """
+        try:
+            serializer = BulkSignupSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            users = services.register_users(serializer.validated_data['users'])
+            return Response({"message": "Created %d users." % len(users)}, status=status.HTTP_201_CREATED)
+        except Exception:
+            logger.exception("Bulk signup failed")
+            return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ExportView(GenericAPIView):
+    """
+    Player Export View
+    """
+    permission_classes = [IsAdminUser]
+    output_query_param = 'output'
+
+    response_schema_dict = {
+        "200": openapi.Response(
+            description="Every Player In Leaderboard Order, Streamed As CSV Or NDJSON. An export failing part way "
+                        "ends with an `ERROR,Export failed` row (CSV) or an `{\"error\": \"Export failed\"}` "
+                        "line (NDJSON).",
+            examples={
+                "text/csv": "rank,google_id,name,email,level,score,level_reached_at,attempts,coins,ref_code,"
+                            "ref_success,refferral_availed\r\n"
+                            "1,1223123434343,Mrigank,195516@nith.ac.in,4,310,2021-03-12T19:02:11.532+05:30,"
+                            "27,180,195a0b1c2,3,False\r\n",
+                "application/x-ndjson": '{"rank": 1, "google_id": "1223123434343", "name": "Mrigank", ...}\n'
+            }
+        ),
+        "400": openapi.Response(
+            description="Unknown Output Format.",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "output must be one of: csv, ndjson"
+                }
+            }
+        )
+    }
+    manual_parameters = [
+        openapi.Parameter('output', openapi.IN_QUERY, description="`csv` (default) or `ndjson`.",
+                          type=openapi.TYPE_STRING),
+    ]
+
+    @swagger_auto_schema(responses=response_schema_dict, manual_parameters=manual_parameters)
+    def get(self, request):
+        """
+        ## Export Every Player With Profile, Account And Referral Stats (Admin Only).
+        - ## Streamed in leaderboard order, so it works for any number of players. Under ASGI, Django
+        3.1 iterates streamed responses on the event loop, where queries are not allowed; use a WSGI
+        worker or the `export_players` command.
+        """
+        output = request.query_params.get(self.output_query_param, 'csv')
+        if output not in export.FORMATS:
+            return Response({"message": "output must be one of: %s" % ', '.join(export.FORMATS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Nothing is queried until the body is streamed, so there is no error to catch here;
+        # export.stream() ends a failed body with an error line.
+        response = StreamingHttpResponse(export.stream(output, view_name(request)),
+                                         content_type=export.FORMATS[output])
+        response['Content-Disposition'] = 'attachment; filename="paradox-players.%s"' % output
+        return response
+
+
 class LeaderBoardView(GenericAPIView):
     """
     LeaderBoard View
     """
     serializer_class = LeaderBoardSerializer
-    queryset = Profile.objects.all().order_by('-score')
+    pagination_class = LeaderBoardPagination
+    queryset = with_balance(Profile.objects.all()).order_by(*LEADERBOARD_ORDERING)
     response_schema_dict = {
         "200": openapi.Response(
-            description="Users List In Sorted Order Based on Score For LeaderBoard.",
+            description="One Page Of Users In Sorted Order Based on Level, Score And Level Reached Time For LeaderBoard. "
+                        "Pass `next` back as `cursor` to fetch the following page.",
             schema=LeaderBoardSerializer,
             examples={
-                "application/json": [
-                    {
-                        "user": "1223123434343",
-                        "name": "195516@nith.ac.in",
-                        "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
-                        "level": 1,
-                        "score": 0,
-                        "coins": 550,
-                        "refferral_availed": False
-                    },
-                    {
-                        "user": "12231234343mj43",
-                        "name": "1955168@nith.ac.in",
-                        "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
-                        "level": 1,
-                        "score": 0,
-                        "coins": 100,
-                        "refferral_availed": True
-                    }]
+                "application/json": {
+                    "next": "WzAsIjEyMjMxMjM0MzQzbWo0MyJd",
+                    "results": [
+                        {
+                            "user": "1223123434343",
+                            "name": "195516@nith.ac.in",
+                            "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
+                            "level": 1,
+                            "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
+                            "score": 0,
+                            "coins": 550,
+                            "refferral_availed": False
+                        },
+                        {
+                            "user": "12231234343mj43",
+                            "name": "1955168@nith.ac.in",
+                            "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
+                            "level": 1,
+                            "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
+                            "score": 0,
+                            "coins": 100,
+                            "refferral_availed": True
+                        }]
+                }
+            }
+        ),
+        "304": openapi.Response(
+            description="First Page Unchanged Since The ETag Sent In If-None-Match."
+        ),
+        "404": openapi.Response(
+            description="Invalid Cursor",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Invalid cursor"
+                }
             }
         ),
         "500": openapi.Response(
@@ -133,23 +298,228 @@ class LeaderBoardView(GenericAPIView):
             }
         )
     }
+    manual_parameters = [
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Number of rows per page.",
+                          type=openapi.TYPE_INTEGER),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="`next` value from the previous page.",
+                          type=openapi.TYPE_STRING),
+    ]
 
-    @swagger_auto_schema(responses=response_schema_dict)
+    # First pages are the hot polling path, so they are served from per-limit snapshots.
+    snapshots = {}
+
+    @classmethod
+    def render_first_page(cls, limit):
+        paginator = cls.pagination_class()
+        page = paginator.paginate(cls.queryset.all(), limit)
+        data = {'next': paginator.next_cursor, 'results': LeaderBoardSerializer(page, many=True).data}
+        return JSONRenderer().render(data)
+
+    @classmethod
+    def get_snapshot(cls, limit):
+        snapshot = cls.snapshots.get(limit)
+        if snapshot is None:
+            snapshot = cls.snapshots.setdefault(limit, Snapshot(
+                partial(cls.render_first_page, limit),
+                getattr(settings, 'LEADERBOARD_SNAPSHOT_MAX_AGE_MS', 500)))
+        return snapshot
+
+    @swagger_auto_schema(responses=response_schema_dict, manual_parameters=manual_parameters)
     def get(self, request):
         """
         ## Retrieve LeaderBoard
+        - ## Paginated with `limit` and `cursor`, ordered by level, then score, then who reached the level
+        first, with google id as the last tiebreaker.
+        - ## The first page carries an `ETag`; send it back in `If-None-Match` to get an empty 304.
         """
         try:
-            return Response(LeaderBoardSerializer(self.get_queryset(), many=True).data, status=status.HTTP_200_OK)
+            if not request.query_params.get(self.paginator.cursor_query_param):
+                content, etag = self.get_snapshot(self.paginator.get_limit(request)).get()
+                return conditional_response(request, content, etag)
+            page = self.paginate_queryset(self.get_queryset())
+            return self.get_paginated_response(LeaderBoardSerializer(page, many=True).data)
+        except NotFound as e:
+            return Response({"message": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class LeaderBoardRankView(GenericAPIView):
+    """
+    LeaderBoard Rank View
+    """
+    serializer_class = LeaderBoardRankSerializer
+
+    response_schema_dict = {
+        "200": openapi.Response(
+            description="Rank Of User On LeaderBoard (1 is the top).",
+            schema=LeaderBoardRankSerializer,
+            examples={
+                "application/json": {
+                    "google_id": "1223123434343",
+                    "rank": 12,
+                    "total": 5230
+                }
+            }
+        ),
+        "404": openapi.Response(
+            description="User not found.",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "User Not Found. Invalid google_id Provided"
+                }
+            }
+        ),
+        "500": openapi.Response(
+            description="Internal Server Error",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Internal Server Error"
+                }
+            }
+        )
+    }
+
+    @swagger_auto_schema(responses=response_schema_dict)
+    def get(self, request, google_id):
+        """
+        ## Retrieve Rank Of a User On LeaderBoard
+        - ## Answered from the in-memory rank index, without a database query.
+        """
+        try:
+            rank = leaderboard_index.rank(google_id)
+            if rank is None:
+                return Response({"message": "User Not Found. Invalid google_id Provided"},
+                                status=status.HTTP_404_NOT_FOUND)
+            return Response({"google_id": google_id, "rank": rank, "total": len(leaderboard_index)},
+                            status=status.HTTP_200_OK)
+        except:
+            return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class LeaderBoardAroundView(GenericAPIView):
+    """
+    LeaderBoard Around User View
+    """
+    serializer_class = LeaderBoardWindowSerializer
+    default_top = 10
+    max_top = 50
+    default_radius = 5
+    max_radius = 25
+
+    response_schema_dict = {
+        "200": openapi.Response(
+            description="Top Of LeaderBoard And Users Just Above And Below The User. "
+                        "`around_start` is the rank of the first row in `around`.",
+            schema=LeaderBoardWindowSerializer,
+            examples={
+                "application/json": {
+                    "rank": 12,
+                    "total": 5230,
+                    "around_start": 11,
+                    "top": [
+                        {
+                            "user": "12231234343mj43",
+                            "name": "1955168@nith.ac.in",
+                            "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
+                            "level": 4,
+                            "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
+                            "score": 310,
+                            "coins": 100,
+                            "refferral_availed": True
+                        }
+                    ],
+                    "around": [
+                        {
+                            "user": "1223123434343",
+                            "name": "195516@nith.ac.in",
+                            "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
+                            "level": 2,
+                            "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
+                            "score": 120,
+                            "coins": 550,
+                            "refferral_availed": False
+                        }
+                    ]
+                }
+            }
+        ),
+        "404": openapi.Response(
+            description="User not found.",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "User Not Found. Invalid google_id Provided"
+                }
+            }
+        ),
+        "500": openapi.Response(
+            description="Internal Server Error",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Internal Server Error"
+                }
+            }
+        )
+    }
+    manual_parameters = [
+        openapi.Parameter('top', openapi.IN_QUERY, description="Number of rows from the top (default 10).",
+                          type=openapi.TYPE_INTEGER),
+        openapi.Parameter('radius', openapi.IN_QUERY,
+                          description="Number of rows above and below the user (default 5).",
+                          type=openapi.TYPE_INTEGER),
+    ]
+
+    def get_count(self, request, name, default, maximum):
+        try:
+            return max(0, min(int(request.query_params.get(name, default)), maximum))
+        except ValueError:
+            return default
+
+    @swagger_auto_schema(responses=response_schema_dict, manual_parameters=manual_parameters)
+    def get(self, request, google_id):
+        """
+        ## Retrieve Top Of LeaderBoard Plus Users Around a User
+        """
+        try:
+            top = self.get_count(request, 'top', self.default_top, self.max_top)
+            radius = self.get_count(request, 'radius', self.default_radius, self.max_radius)
+            window = leaderboard_window(google_id, top=top, radius=radius)
+            if window is None:
+                return Response({"message": "User Not Found. Invalid google_id Provided"},
+                                status=status.HTTP_404_NOT_FOUND)
+            top_rows, around, around_start, rank, total = window
+            return Response({
+                "rank": rank,
+                "total": total,
+                "around_start": around_start,
+                "top": LeaderBoardSerializer(top_rows, many=True).data,
+                "around": LeaderBoardSerializer(around, many=True).data
+            }, status=status.HTTP_200_OK)
+        except:
+            return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def load_user(google_id):
+    """
+    A user with their profile, hint level and referral, in one query, or None. profile.coins
+    is the exact balance: the snapshot plus the ledger entries not yet compacted into it.
+    """
+    user = ParadoxUser.objects.select_related('profile', 'userhintlevel', 'referral') \
+        .annotate(pending_coins=pending_coins('pk', 'profile__coins_through')).filter(google_id=google_id).first()
+    if user is not None:
+        user.profile.coins += user.pending_coins
+    return user
+
+
 class ProfileDetailsView(GenericAPIView):
     """
     Profile Detail View
     """
-    serializer_class = ProfileSerializer
+    serializer_class = UserDetailsSerializer
 
     response_schema_dict = {
         "200": openapi.Response(
@@ -167,11 +537,20 @@ class ProfileDetailsView(GenericAPIView):
                         "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
                         "reg_time": "2021-02-04T04:07:08.283313+05:30",
                         "level": 1,
+                        "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
                         "attempts": 0,
                         "score": 0,
                         "coins": 100,
                         "super_coins": 100,
                         "refferral_availed": False
+                    },
+                    "hints": {
+                        "level": 1,
+                        "hintNumber": 0
+                    },
+                    "referral": {
+                        "ref_code": "Mri525092",
+                        "ref_success": 2
                     }
                 }
             }
@@ -204,14 +583,108 @@ class ProfileDetailsView(GenericAPIView):
         - ## Full Profile Using GoogleId provided by Google at the time of Sign-In Using Google.
         """
         try:
-            if len(ParadoxUser.objects.filter(google_id=google_id)) == 0:
+            return Response(*self.details(google_id))
+        except:
+            return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def details(google_id):
+        """
+        (data, status) of the profile details response; shared with the async view.
+        """
+        user = load_user(google_id)
+        if user is None:
+            return {"message": "User Not Found. Invalid google_id Provided"}, status.HTTP_404_NOT_FOUND
+        return UserDetailsSerializer(user, many=False).data, status.HTTP_200_OK
+
+
+class GameStateView(GenericAPIView):
+    """
+    Game State View
+    """
+    serializer_class = GameStateSerializer
+    response_schema_dict = {
+        "200": openapi.Response(
+            description="Profile, Current Question (Without Answer), Unlocked Hints, Referral Stats And Rank",
+            schema=GameStateSerializer,
+            examples={
+                "application/json": {
+                    "google_id": "1223123434343",
+                    "profile": {
+                        "user": "1223123434343",
+                        "name": "195516@nith.ac.in",
+                        "image": "https://storage.googleapis.com/sport_application/running%205.jpg",
+                        "reg_time": "2021-03-12T18:30:00+05:30",
+                        "level": 2,
+                        "level_reached_at": "2021-03-12T19:02:11.532907+05:30",
+                        "attempts": 0,
+                        "score": 0,
+                        "coins": 180,
+                        "super_coins": 100,
+                        "refferral_availed": False
+                    },
+                    "question": {
+                        "level": 2,
+                        "location": "/img2.jpeg"
+                    },
+                    "hints": {
+                        "level": 2,
+                        "hintNumber": 1,
+                        "unlocked": ["Look up"]
+                    },
+                    "referral": {
+                        "ref_code": "195a0b1c2",
+                        "ref_success": 3
+                    },
+                    "rank": 12
+                }
+            }
+        ),
+        "404": openapi.Response(
+            description="User not found.",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "User Not Found. Invalid google_id Provided"
+                }
+            }
+        ),
+        "500": openapi.Response(
+            description="Internal Server Error",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Internal Server Error"
+                }
+            }
+        )
+    }
+
+    @swagger_auto_schema(responses=response_schema_dict)
+    def get(self, request, google_id):
+        """
+        ## Everything The App Needs On Launch, In One Request
+        - ## One query for the user's rows; the question and hints come from the catalog cache
+        and the rank from the in-memory rank index.
+        """
+        try:
+            user = load_user(google_id)
+            if user is None:
                 return Response({"message": "User Not Found. Invalid google_id Provided"},
                                 status=status.HTTP_404_NOT_FOUND)
-            else:
-                response = UserSerializer(ParadoxUser.objects.get(google_id=google_id), many=False).data
-                response['profile'] = ProfileSerializer(Profile.objects.get(user__google_id__exact=google_id),
-                                                        many=False).data
-                return Response(response, status.HTTP_200_OK)
+            hint_level = user.userhintlevel
+            hint = catalog.hint(hint_level.level)
+            unlocked = [getattr(hint, 'hint%d' % number) for number in range(1, hint_level.hintNumber + 1)] \
+                if hint is not None else []
+            state = {
+                "google_id": user.google_id,
+                "profile": user.profile,
+                "question": catalog.question(user.profile.level),
+                "hints": {"level": hint_level.level, "hintNumber": hint_level.hintNumber, "unlocked": unlocked},
+                "referral": user.referral,
+                "rank": profile_rank(user.profile),
+            }
+            return Response(GameStateSerializer(state).data, status=status.HTTP_200_OK)
         except:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -242,6 +715,9 @@ class QuestionView(GenericAPIView):
                 ]
             }
         ),
+        "304": openapi.Response(
+            description="Unchanged Since The ETag Sent In If-None-Match."
+        ),
         "500": openapi.Response(
             description="Internal Server Error",
             schema=MessageSerializer,
@@ -257,9 +733,12 @@ class QuestionView(GenericAPIView):
     def get(self, request):
         """
         ## Retrieve all questions present in Paradox Game.
+        - ## Send the `ETag` back in `If-None-Match` to get an empty 304 while the questions are unchanged.
         """
         try:
-            return Response(QuestionSerializer(self.get_queryset(), many=True).data, status=status.HTTP_200_OK)
+            content, etag = catalog.rendered('questions', partial(render_list, QuestionSerializer))
+            return conditional_response(request, content, etag,
+                                        cache_control=getattr(settings, 'CATALOG_CACHE_CONTROL', 'no-cache'))
         except:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -292,6 +771,9 @@ class HintsView(GenericAPIView):
                 ]
             }
         ),
+        "304": openapi.Response(
+            description="Unchanged Since The ETag Sent In If-None-Match."
+        ),
         "500": openapi.Response(
             description="Internal Server Error",
             schema=MessageSerializer,
@@ -307,9 +789,12 @@ class HintsView(GenericAPIView):
     def get(self, request):
         """
         ## Retrieve List Of Hints Present in Paradox Game.
+        - ## Send the `ETag` back in `If-None-Match` to get an empty 304 while the hints are unchanged.
         """
         try:
-            return Response(HintSerializer(self.get_queryset(), many=True).data, status=status.HTTP_200_OK)
+            content, etag = catalog.rendered('hints', partial(render_list, HintSerializer))
+            return conditional_response(request, content, etag,
+                                        cache_control=getattr(settings, 'CATALOG_CACHE_CONTROL', 'no-cache'))
         except:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -360,22 +845,13 @@ class ReferralView(GenericAPIView):
             serializer = RefferalSerializer(data=data)
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            user_profile = Profile.objects.get(user__google_id=serializer.validated_data['user'])
-            referral = Referral.objects.get(ref_code=serializer.validated_data['ref_code'])
-            if user_profile.refferral_availed:
+            google_id = serializer.validated_data['user']
+            referral = serializer.validated_data['referral']
+            if referral.user_id == google_id:
+                return Response({'message': 'Cannot Avail Referral of yourself.'}, status=status.HTTP_400_BAD_REQUEST)
+            if not services.redeem_referral(google_id, referral.user_id):
                 return Response({'message': 'user has already availed referral points.'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            if referral.user.google_id == user_profile.user.google_id:
-                return Response({'message': 'Cannot Avail Referral of yourself.'}, status=status.HTTP_400_BAD_REQUEST)
-            user_profile.coins += 100
-            user_profile.refferral_availed = True
-            user_profile.save()
-            referral = Referral.objects.get(ref_code=serializer.validated_data['ref_code'])
-            referral.ref_success += 1
-            referral.save()
-            profile_of_refferer = Profile.objects.get(user__google_id=referral.user.google_id)
-            profile_of_refferer.coins += 100
-            profile_of_refferer.save()
             return Response({"message": "Referral Successfully Availed"}, status=status.HTTP_200_OK)
         except Exception as e:
             print(e)
@@ -512,36 +988,84 @@ class ExeMemberPositionsView(GenericAPIView):
                         status=status.HTTP_200_OK)
 
 
-class DecreaseCoins(GenericAPIView):
+class BuyHintView(GenericAPIView):
     """
-    Decrease coins of user when they avail Hints
+    Buy Hint View
     """
     serializer_class = UserHintLevelSerializer
+    response_schema_dict = {
+        "200": openapi.Response(
+            description="Hint Unlocked, With Its Text And The New Coin Balance",
+            schema=HintPurchaseSerializer,
+            examples={
+                "application/json": {
+                    "message": "Hint Unlocked.",
+                    "hintNumber": 1,
+                    "hint": "Look up",
+                    "coins": 80
+                }
+            }
+        ),
+        "400": openapi.Response(
+            description="Errors",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Not sufficient coins."
+                }
+            }
+        ),
+        "500": openapi.Response(
+            description="Internal Server Error",
+            schema=MessageSerializer,
+            examples={
+                "application/json": {
+                    "message": "Internal Server Error"
+                }
+            }
+        )
+    }
 
+    @swagger_auto_schema(responses=response_schema_dict)
     def post(self, request):
         """
-        Decrease coins of user when they avail Hints
+        - ## Buy The Next Hint Of The Current Level
+        - ## Costs 20, 30 and 40 coins for the first, second and third hint.
         """
-        coins = {
-            "1": 20,
-            "2": 30,
-            "3": 40
-        }
-        data = request.data
-        serializer = UserSerializer(data=data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        validated_data = serializer.validated_data
-        hintDetails = UserHintLevel.objects.get(user__google_id=validated_data['google_id'])
-        userProfile = Profile.objects.get(user__google_id=validated_data['google_id'])
-        hintDetails.hintNumber += 1
-        if userProfile.coins >= coins[str(hintDetails.level)]:
-            userProfile.coins = userProfile.coins - coins[str(hintDetails.level)]
-        else:
-            return Response({"message": "Not sufficient coins."}, status=status.HTTP_400_BAD_REQUEST)
-        hintDetails.save()
-        userProfile.save()
-        return Response({"message": "Updated User Coins."}, status=status.HTTP_200_OK)
+        try:
+            data = request.data
+            serializer = UserHintLevelSerializer(data=data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            validated_data = serializer.validated_data
+            google_id, level, hint_number = validated_data['google_id'], validated_data['level'], \
+                validated_data['hintNumber']
+            coins = services.buy_hint(google_id, level, hint_number)
+            if coins is None:
+                return Response({"message": self.refusal(google_id, level, hint_number)},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                "message": "Hint Unlocked.",
+                "hintNumber": hint_number,
+                "hint": getattr(validated_data['hint'], 'hint%d' % hint_number),
+                "coins": coins,
+            }, status=status.HTTP_200_OK)
+        except:
+            return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def refusal(google_id, level, hint_number):
+        """
+        Why a purchase was refused; only looked up once it has been.
+        """
+        hint_level = UserHintLevel.objects.filter(user_id=google_id).first()
+        if hint_level is None or hint_level.level != level:
+            return "Invalid Level Number"
+        if hint_level.hintNumber >= hint_number:
+            return "User Has Already Redeemed the Hint."
+        if hint_level.hintNumber < hint_number - 1:
+            return "Previous Hints Not Redeemed."
+        return "Not sufficient coins."
 
 
 class CheckAnswerView(GenericAPIView):
@@ -549,6 +1073,8 @@ class CheckAnswerView(GenericAPIView):
     Check Answer View
     """
     serializer_class = AnswerSerializer
+    throttle_classes = [GoogleIdBucketThrottle, IPBucketThrottle]
+    throttle_scope = 'check_answer'
 
     response_schema_dict = {
         "200": openapi.Response(
@@ -569,6 +1095,14 @@ class CheckAnswerView(GenericAPIView):
                 }
             }
         ),
+        "429": openapi.Response(
+            description="Too Many Attempts From This google_id Or IP",
+            examples={
+                "application/json": {
+                    "detail": "Request was throttled. Expected available in 2 seconds."
+                }
+            }
+        ),
         "500": openapi.Response(
             description="Internal Server Error",
             schema=MessageSerializer,
@@ -587,27 +1121,29 @@ class CheckAnswerView(GenericAPIView):
         - ## Reward Points
         """
         try:
-            data = request.data
-            serializer = AnswerSerializer(data=data)
-            if not serializer.is_valid():
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            validated_data = serializer.validated_data
-            question = Questions.objects.get(level=validated_data)
-            if question.answer == validated_data.answer.strip():
-                profile = Profile.objects.get(user__google_id=validated_data['google_id'])
-                userHint = UserHintLevel.objects.get(user__google_id=validated_data['google_id'])
-                profile.coins += 100
-                profile.level += 1
-                userHint.level = profile.level
-                userHint.hintNumber = 0
-                userHint.save()
-                profile.save()
-                return Response({"message": "Correct answer"}, status=status.HTTP_200_OK)
-            else:
-                return Response({"message": "Incorrect answer"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(*self.check(request.data))
         except:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def check(data):
+        """
+        (data, status) of the answer check response; shared with the async view.
+        """
+        serializer = AnswerSerializer(data=data)
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        validated_data = serializer.validated_data
+        question = validated_data['question']
+        correct = question.answer == validated_data['answer'].strip()
+        attempt_log.record(validated_data['google_id'], validated_data['level'], validated_data['answer'], correct)
+        if correct:
+            if not services.advance_level(validated_data['google_id'], validated_data['level']):
+                return {"message": "Invalid Level Number"}, status.HTTP_400_BAD_REQUEST
+            return {"message": "Correct answer"}, status.HTTP_200_OK
+        else:
+            return {"message": "Incorrect answer"}, status.HTTP_400_BAD_REQUEST
+
 
 class UserPresentView(GenericAPIView):
     """
@@ -650,7 +1186,7 @@ class UserPresentView(GenericAPIView):
         ## Get Method to check whether a User with a google Id is present in database or not.
         """
         try:
-            if len(ParadoxUser.objects.filter(google_id=google_id)) > 0:
+            if google_id in membership_index:
                 return Response({'userPresent': True}, status=status.HTTP_200_OK)
             else:
                 return Response({'userPresent': False}, status=status.HTTP_404_NOT_FOUND)
@@ -708,9 +1244,8 @@ class UpdateUserCoinsView(GenericAPIView):
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             validated_data = serializer.validated_data
-            profile = Profile.objects.get(user__google_id=validated_data['google_id'])
-            profile.coins += int(validated_data['coins'])
-            profile.save()
+            if not services.add_coins(validated_data['google_id'], int(validated_data['coins'])):
+                return Response({"user": ["User Not found. Invalid Google Id."]}, status=status.HTTP_400_BAD_REQUEST)
             return Response({"message": "Coins Updated"}, status=status.HTTP_200_OK)
         except:
             return Response({"message": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,43 @@
+"""
+Warm Up Process-Local Caches When A Server Process Starts
+"""
+import logging
+
+from django.core.signals import request_started
+from django.db import DatabaseError, connection
+
+from .attempts import attempt_log
+from .ledger import start_compactor
+from .leaderboard import leaderboard_index, start_resyncer
+from .membership import membership_index
+
+logger = logging.getLogger(__name__)
+
+
+def start_background_work(**kwargs):
+    """
+    Start this process's coin ledger compactor, attempt log flusher and rank index resyncer, once.
+
+    Run on each request rather than when the application is imported: a server that imports
+    the application and then forks its workers (gunicorn --preload) would otherwise run the
+    threads in the master, which serves no request, and in none of the workers.
+    """
+    start_compactor()
+    attempt_log.start()
+    start_resyncer()
+
+
+def warm_up():
+    """
+    Load the in-memory indexes before the first request instead of during it, and have the
+    first request of each process start the background work. Failures are logged and left to
+    the lazy load on first use.
+    """
+    request_started.connect(start_background_work, dispatch_uid='apis.warmup.start_background_work')
+    try:
+        leaderboard_index.load()
+        membership_index.load()
+    except DatabaseError as e:
+        logger.warning("Skipping cache warm up: %s", e)
+    finally:
+        connection.close()
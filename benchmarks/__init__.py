@@ -0,0 +1,6 @@
+"""
+Benchmarks For The Paradox APIs
+
+Each module is a script run from the repository root, e.g. `python -m benchmarks.user_present`.
+They work on a throwaway SQLite database, never on db.sqlite3.
+"""
@@ -0,0 +1,121 @@
+"""
+Coin Writes Under Contention: Profile UPDATE vs Ledger Append
+
+    python -m benchmarks.coin_ledger [--users 2000] [--hot 20] [--threads 16] [--writes 500]
+
+Concurrent threads credit coins to a small set of hot users, once with the old in-place
+`UPDATE Profile SET coins = coins + n` and once by appending to the coin ledger while the
+compactor folds it into Profile every --compact-seconds. Prints throughput and p50/p95/p99
+latency per write, then checks that no credit was lost: after a final compaction every
+Profile.coins, and every exact balance, must equal the start balance plus the credits.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from benchmarks.common import setup_django, seed_users, summarize
+
+
+def profile_update(google_id, amount):
+    from django.db.models import F
+    from apis.models import Profile
+    Profile.objects.filter(user_id=google_id).update(coins=F('coins') + amount)
+
+
+def ledger_append(google_id, amount):
+    from apis import services
+    services.add_coins(google_id, amount)
+
+
+def run(write, hot, threads, writes):
+    """
+    Run `threads` threads doing `writes` credits each to random users of `hot`.
+    Returns the latencies and the credits per user.
+    """
+    from django.db import connection
+    samples = []
+    credits = {}
+    lock = threading.Lock()
+    errors = []
+
+    def worker(seed):
+        generator = random.Random(seed)
+        mine, given = [], {}
+        try:
+            for _ in range(writes):
+                google_id, amount = generator.choice(hot), generator.randint(1, 10)
+                started = time.perf_counter()
+                write(google_id, amount)
+                mine.append(time.perf_counter() - started)
+                given[google_id] = given.get(google_id, 0) + amount
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+        with lock:
+            samples.extend(mine)
+            for google_id, amount in given.items():
+                credits[google_id] = credits.get(google_id, 0) + amount
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, samples, credits, errors
+
+
+def reset():
+    from apis.models import CoinLedgerCheckpoint, CoinTransaction, Profile
+    CoinTransaction.objects.all().delete()
+    CoinLedgerCheckpoint.objects.update(compacted_through=0)
+    Profile.objects.update(coins=100, coins_through=0)
+
+
+def verify(credits):
+    """
+    Users whose snapshot or exact balance differs from 100 plus their credits.
+    """
+    from apis import ledger
+    from apis.models import Profile
+    ledger.compact()
+    snapshots = dict(Profile.objects.filter(user_id__in=list(credits)).values_list('user_id', 'coins'))
+    return sorted(google_id for google_id, amount in credits.items()
+                  if snapshots[google_id] != 100 + amount or ledger.balance(google_id) != 100 + amount)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--hot', type=int, default=20, help="Users receiving every credit.")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=500, help="Credits per thread.")
+    parser.add_argument('--compact-seconds', type=float, default=0.5)
+    options = parser.parse_args()
+
+    setup_django(COIN_LEDGER_COMPACT_SECONDS=0, COIN_LEDGER_SETTLE_SECONDS=0)
+    from apis.ledger import Compactor
+    from apis.membership import membership_index
+    seed_users(options.users)
+    membership_index.load()
+    hot = ['bench-%d' % i for i in range(options.hot)]
+
+    results = {'config': vars(options), 'runs': {}}
+    for name, write in (('profile_update', profile_update), ('ledger_append', ledger_append)):
+        reset()
+        compactor = Compactor(options.compact_seconds) if write is ledger_append else None
+        if compactor:
+            compactor.start()
+        seconds, samples, credits, errors = run(write, hot, options.threads, options.writes)
+        if compactor:
+            compactor.stop()
+        results['runs'][name] = dict(summarize(samples), throughput_wps=round(len(samples) / seconds, 1),
+                                     errors=len(errors), wrong_balances=verify(credits))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Shared Setup For Benchmarks
+"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def setup_django(db_path=None, **overrides):
+    """
+    Configure Django against a fresh SQLite file (a temporary one by default) and migrate it.
+    Extra keyword arguments override settings before the app registry is loaded.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Paradox.settings')
+    from django.conf import settings
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='paradox-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def seed_users(count, prefix='bench'):
+    """
+    Sign up `count` synthetic users through the real signup service.
+    """
+    from apis import services
+    batch = 5000
+    for start in range(0, count, batch):
+        services.register_users([
+            {'google_id': '%s-%d' % (prefix, i), 'name': 'Player %d' % i, 'email': '%s%d@example.com' % (prefix, i)}
+            for i in range(start, min(start + batch, count))])
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples):
+    """
+    Latency summary in microseconds of a list of durations in seconds.
+    """
+    return {
+        'count': len(samples),
+        'mean_us': round(statistics.mean(samples) * 1e6, 1),
+        'p50_us': round(percentile(samples, 0.50) * 1e6, 1),
+        'p95_us': round(percentile(samples, 0.95) * 1e6, 1),
+        'p99_us': round(percentile(samples, 0.99) * 1e6, 1),
+    }
+
+
+def measure(function, arguments):
+    """
+    Call `function` once per item of `arguments` and return the per-call durations.
+    """
+    samples = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        samples.append(time.perf_counter() - started)
+    return samples
@@ -0,0 +1,307 @@
+"""
+Game-Day Load Benchmark
+
+    python -m benchmarks.load [--users 10000] [--levels 30] [--clients 16] [--requests 20000]
+                              [--apps wsgi asgi] [--output benchmarks/results/load-<time>.json]
+                              [--compare earlier-run.json]
+
+Seeds synthetic users, questions and hints through the real models, then replays a game-day
+traffic mix against the WSGI and ASGI applications in-process (no network, no server) with
+concurrent clients. Prints and stores throughput and p50/p95/p99 latency per endpoint as JSON,
+and with --compare the change against an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from benchmarks.common import setup_django, seed_users, percentile
+
+# Share of each kind of request in the replayed traffic.
+TRAFFIC_MIX = {
+    'user_present': 30,
+    'leaderboard': 25,
+    'leaderboard_around': 5,
+    'check_answer': 20,
+    'buy_hint': 5,
+    'update_coins': 10,
+    'referral': 5,
+    'profile': 5,
+}
+
+
+class Game:
+    """
+    Generates requests for the traffic mix, following each player's level as answers succeed.
+    """
+
+    def __init__(self, users, levels, seed=0, mix=None, correct_rate=0.3):
+        from apis.models import Referral
+        mix = mix or TRAFFIC_MIX
+        self.users = users
+        self.levels = levels
+        self.correct_rate = correct_rate
+        self.ref_codes = dict(Referral.objects.values_list('user_id', 'ref_code'))
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.player_levels = {}
+        self.player_hints = {}
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+
+    def player(self):
+        return 'bench-%d' % self.random.randrange(self.users)
+
+    def next_request(self):
+        """
+        (kind, method, path, json body or None) of the next request.
+        """
+        with self.lock:
+            kind = self.random.choices(self.kinds, self.weights)[0]
+            google_id = self.player()
+            if kind == 'user_present':
+                if self.random.random() < 0.1:
+                    google_id = 'unknown-%d' % self.random.randrange(10 ** 9)
+                return kind, 'GET', '/user-present-or-not/%s/' % google_id, None
+            if kind == 'leaderboard':
+                return kind, 'GET', '/leaderboard/', None
+            if kind == 'leaderboard_around':
+                return kind, 'GET', '/leaderboard/around/%s/' % google_id, None
+            if kind == 'profile':
+                return kind, 'GET', '/userProfile/%s/' % google_id, None
+            if kind == 'update_coins':
+                return kind, 'PUT', '/update-coins/', {'google_id': google_id, 'coins': 10}
+            if kind == 'referral':
+                return kind, 'POST', '/refferral/', {'user': google_id, 'ref_code': self.ref_codes[self.player()]}
+            level = min(self.player_levels.get(google_id, 1), self.levels)
+            if kind == 'buy_hint':
+                hint_number = min(self.player_hints.get(google_id, 0) + 1, 3)
+                return kind, 'POST', '/buy-hint/', {'google_id': google_id, 'level': level, 'hintNumber': hint_number}
+            answer = 'answer%d' % level if self.random.random() < self.correct_rate else 'wrong'
+            return kind, 'POST', '/check-answer/', {'google_id': google_id, 'level': level, 'answer': answer}
+
+    def record(self, kind, body, status):
+        if status != 200:
+            return
+        with self.lock:
+            if kind == 'check_answer':
+                self.player_levels[body['google_id']] = body['level'] + 1
+                self.player_hints.pop(body['google_id'], None)
+            elif kind == 'buy_hint':
+                self.player_hints[body['google_id']] = body['hintNumber']
+
+
+def seed(users, levels):
+    from apis.models import Questions, Hints
+    seed_users(users)
+    Questions.objects.bulk_create([Questions(level=level, location='/img%d.jpeg' % level, answer='answer%d' % level)
+                                   for level in range(1, levels + 1)])
+    Hints.objects.bulk_create([Hints(level=level, hint1='first', hint2='second', hint3='third')
+                               for level in range(1, levels + 1)])
+
+
+def reset():
+    """
+    Put every player back at the start so each application replays the same game.
+    """
+    from apis.models import CoinLedgerCheckpoint, CoinTransaction, Profile, Referral, UserHintLevel
+    CoinTransaction.objects.all().delete()
+    CoinLedgerCheckpoint.objects.update(compacted_through=0)
+    Profile.objects.update(level=1, coins=100, coins_through=0, score=0, refferral_availed=False)
+    Referral.objects.update(ref_success=0)
+    UserHintLevel.objects.update(level=1, hintNumber=0)
+
+
+def call_wsgi(application, method, path, body):
+    url = urlsplit(path)
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': url.path, 'QUERY_STRING': url.query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': '127.0.0.1', 'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': BytesIO(payload), 'wsgi.errors': BytesIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    started = []
+    result = application(environ, lambda status, headers, exc_info=None: started.append(status))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(started[0].split()[0])
+
+
+async def call_asgi(application, method, path, body):
+    url = urlsplit(path)
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': url.path, 'raw_path': url.path.encode(), 'query_string': url.query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode())],
+        'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+    }
+    sent = []
+
+    async def receive():
+        if sent:
+            await asyncio.Event().wait()
+        sent.append(True)
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    statuses = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, kind, status, seconds):
+        with self.lock:
+            self.samples.setdefault(kind, []).append((status, seconds))
+
+    def report(self, wall_seconds):
+        endpoints = {}
+        total = 0
+        for kind, samples in sorted(self.samples.items()):
+            latencies = [seconds for _, seconds in samples]
+            statuses = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            total += len(samples)
+            endpoints[kind] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / wall_seconds, 1),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+                'statuses': statuses,
+            }
+        return {'requests': total, 'seconds': round(wall_seconds, 3),
+                'throughput_rps': round(total / wall_seconds, 1), 'endpoints': endpoints}
+
+
+def run_wsgi(game, clients, requests):
+    from Paradox.wsgi import application
+    from django.db import connection
+    recorder = Recorder()
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        try:
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                kind, method, path, body = game.next_request()
+                started = time.perf_counter()
+                status = call_wsgi(application, method, path, body)
+                recorder.add(kind, status, time.perf_counter() - started)
+                game.record(kind, body, status)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        for future in [pool.submit(client) for _ in range(clients)]:
+            future.result()
+    return recorder.report(time.perf_counter() - started)
+
+
+def run_asgi(game, clients, requests):
+    from Paradox.asgi import application
+    recorder = Recorder()
+    remaining = iter(range(requests))
+
+    async def client():
+        while next(remaining, None) is not None:
+            kind, method, path, body = game.next_request()
+            started = time.perf_counter()
+            status = await call_asgi(application, method, path, body)
+            recorder.add(kind, status, time.perf_counter() - started)
+            game.record(kind, body, status)
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return recorder.report(time.perf_counter() - started)
+
+
+def compare(current, previous):
+    """
+    Relative change of throughput and p95 per app and endpoint against an earlier run.
+    """
+    changes = {}
+    for app, run in current['apps'].items():
+        before = previous.get('apps', {}).get(app)
+        if not before:
+            continue
+        changes[app] = {}
+        for kind, stats in run['endpoints'].items():
+            old = before['endpoints'].get(kind)
+            if old and old['throughput_rps'] and old['p95_ms']:
+                changes[app][kind] = {
+                    'throughput': '%+.1f%%' % ((stats['throughput_rps'] / old['throughput_rps'] - 1) * 100),
+                    'p95': '%+.1f%%' % ((stats['p95_ms'] / old['p95_ms'] - 1) * 100),
+                }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--levels', type=int, default=30)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=20000, help="Requests per application.")
+    parser.add_argument('--apps', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--db', help="SQLite file to use instead of a temporary one.")
+    parser.add_argument('--output', help="Where to store the JSON results.")
+    parser.add_argument('--compare', help="Earlier results file to compare against.")
+    options = parser.parse_args()
+
+    # A few clients replay the traffic of many players, so per-IP and per-user limits are off.
+    setup_django(options.db, ALLOWED_HOSTS=['localhost'], THROTTLE_BUCKETS={})
+    seed(options.users, options.levels)
+    runners = {'wsgi': run_wsgi, 'asgi': run_asgi}
+    results = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'users': options.users, 'levels': options.levels, 'clients': options.clients,
+                   'requests': options.requests, 'mix': TRAFFIC_MIX},
+        'apps': {},
+    }
+    for app in options.apps:
+        reset()
+        results['apps'][app] = runners[app](Game(options.users, options.levels), options.clients, options.requests)
+    if options.compare:
+        with open(options.compare) as file:
+            results['compared_to'] = {'file': options.compare, 'changes': compare(results, json.load(file))}
+
+    output = options.output or os.path.join('benchmarks', 'results', 'load-%s.json' % time.strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print("Results stored in %s" % output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+/user-present-or-not/ Lookup: Query Per Check vs Membership Index
+
+    python -m benchmarks.user_present [--users 100000] [--lookups 20000]
+
+Compares the old `len(ParadoxUser.objects.filter(...))` check and a plain `.exists()` probe
+with the Bloom filter membership index, for registered google_ids (first and repeated checks)
+and unknown ones.
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import setup_django, seed_users, measure, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    options = parser.parse_args()
+
+    setup_django()
+    from apis.membership import membership_index
+    from apis.models import ParadoxUser
+    seed_users(options.users)
+    membership_index.load()
+
+    known = ['bench-%d' % random.randrange(options.users) for _ in range(options.lookups)]
+    unknown = ['missing-%d' % i for i in range(options.lookups)]
+    paths = {
+        'len(filter())': lambda google_id: len(ParadoxUser.objects.filter(google_id=google_id)) > 0,
+        'exists()': lambda google_id: ParadoxUser.objects.filter(google_id=google_id).exists(),
+        'membership_index': lambda google_id: google_id in membership_index,
+    }
+    results = {'users': options.users, 'lookups': options.lookups,
+               'bloom_bytes': len(membership_index.bloom.bits), 'paths': {}}
+    for name, check in paths.items():
+        results['paths'][name] = {'known': summarize(measure(check, known)),
+                                  'known_repeat': summarize(measure(check, known)),
+                                  'unknown': summarize(measure(check, unknown))}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
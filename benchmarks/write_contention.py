@@ -0,0 +1,67 @@
+"""
+Write Contention: SQLite Defaults vs SQLITE_PRAGMAS
+
+    python -m benchmarks.write_contention [--users 2000] [--clients 16] [--requests 5000]
+
+Replays only writes, answer submissions (/check-answer/, mostly correct) and coin updates
+(/update-coins/), from concurrent clients against the WSGI application, once on a database
+with SQLite's default settings and once with the SQLITE_PRAGMAS of the settings profile.
+Each run gets its own fresh database file. Prints throughput, p50/p95/p99 latency and
+response statuses (500s are "database is locked" failures) per endpoint.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import setup_django
+from benchmarks.load import Game, run_wsgi, seed
+
+WRITE_MIX = {'check_answer': 50, 'update_coins': 50}
+
+
+def use_database(path, pragmas):
+    """
+    Point Django at a new database file opened with `pragmas`, migrate and seed it.
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+    connections.close_all()
+    settings.SQLITE_PRAGMAS = pragmas
+    settings.DATABASES['default']['NAME'] = path
+    call_command('migrate', verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--levels', type=int, default=30)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=5000)
+    options = parser.parse_args()
+
+    # A few clients replay the traffic of many players, so per-IP and per-user limits are off.
+    setup_django(ALLOWED_HOSTS=['localhost'], THROTTLE_BUCKETS={})
+    from django.conf import settings
+    from apis.catalog import catalog
+    from apis.leaderboard import leaderboard_index
+    from apis.membership import membership_index
+    profiles = {'sqlite_defaults': {}, 'sqlite_pragmas': dict(settings.SQLITE_PRAGMAS)}
+    directory = tempfile.mkdtemp(prefix='paradox-contention-')
+
+    results = {'config': {'users': options.users, 'clients': options.clients, 'requests': options.requests,
+                          'mix': WRITE_MIX, 'pragmas': profiles['sqlite_pragmas']}, 'runs': {}}
+    for name, pragmas in profiles.items():
+        use_database(os.path.join(directory, name + '.sqlite3'), pragmas)
+        seed(options.users, options.levels)
+        membership_index.load()
+        leaderboard_index.load()
+        catalog.invalidate()
+        game = Game(options.users, options.levels, mix=WRITE_MIX, correct_rate=0.9)
+        results['runs'][name] = run_wsgi(game, options.clients, options.requests)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()